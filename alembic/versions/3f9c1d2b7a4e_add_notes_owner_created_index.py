@@ -0,0 +1,27 @@
+"""add notes (owner_id, created_at) index
+
+Revision ID: 3f9c1d2b7a4e
+Revises: 6a2def7ea782
+Create Date: 2026-10-19 10:12:41.532087
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c1d2b7a4e'
+down_revision: Union[str, Sequence[str], None] = '6a2def7ea782'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_notes_owner_id_created_at', 'notes', ['owner_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notes_owner_id_created_at', table_name='notes')
@@ -0,0 +1,85 @@
+"""add full-text search indexes
+
+Revision ID: 8b1e4f6a9c2d
+Revises: 3f9c1d2b7a4e
+Create Date: 2026-10-19 11:02:17.204415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b1e4f6a9c2d'
+down_revision: Union[str, Sequence[str], None] = '3f9c1d2b7a4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Postgres: expression GIN indexes. The expressions must match app/search.py
+# exactly for the planner to use them.
+POSTGRES_UPGRADE = [
+    "CREATE INDEX ix_notes_search ON notes USING GIN "
+    "(to_tsvector('english', coalesce(title, '') || ' ' || content))",
+    "CREATE INDEX ix_flashcard_decks_search ON flashcard_decks USING GIN "
+    "(to_tsvector('english', topic || ' ' || cards::text))",
+]
+
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_flashcard_decks_search",
+    "DROP INDEX IF EXISTS ix_notes_search",
+]
+
+# SQLite (local testing): external-content FTS5 tables kept in sync by triggers
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE notes_fts USING fts5("
+    "title, content, content='notes', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER notes_fts_ai AFTER INSERT ON notes BEGIN "
+    "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER notes_fts_ad AFTER DELETE ON notes BEGIN "
+    "INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER notes_fts_au AFTER UPDATE OF title, content ON notes BEGIN "
+    "INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')",
+
+    "CREATE VIRTUAL TABLE flashcard_decks_fts USING fts5("
+    "topic, cards, content='flashcard_decks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER flashcard_decks_fts_ai AFTER INSERT ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(rowid, topic, cards) VALUES (new.id, new.topic, new.cards); END",
+    "CREATE TRIGGER flashcard_decks_fts_ad AFTER DELETE ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(flashcard_decks_fts, rowid, topic, cards) VALUES ('delete', old.id, old.topic, old.cards); END",
+    "CREATE TRIGGER flashcard_decks_fts_au AFTER UPDATE OF topic, cards ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(flashcard_decks_fts, rowid, topic, cards) VALUES ('delete', old.id, old.topic, old.cards); "
+    "INSERT INTO flashcard_decks_fts(rowid, topic, cards) VALUES (new.id, new.topic, new.cards); END",
+    "INSERT INTO flashcard_decks_fts(flashcard_decks_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS flashcard_decks_fts_au",
+    "DROP TRIGGER IF EXISTS flashcard_decks_fts_ad",
+    "DROP TRIGGER IF EXISTS flashcard_decks_fts_ai",
+    "DROP TABLE IF EXISTS flashcard_decks_fts",
+    "DROP TRIGGER IF EXISTS notes_fts_au",
+    "DROP TRIGGER IF EXISTS notes_fts_ad",
+    "DROP TRIGGER IF EXISTS notes_fts_ai",
+    "DROP TABLE IF EXISTS notes_fts",
+]
+
+
+def _run(statements: dict) -> None:
+    dialect = op.get_bind().dialect.name
+    for statement in statements.get(dialect, []):
+        op.execute(sa.text(statement))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _run({"postgresql": POSTGRES_UPGRADE, "sqlite": SQLITE_UPGRADE})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _run({"postgresql": POSTGRES_DOWNGRADE, "sqlite": SQLITE_DOWNGRADE})
@@ -0,0 +1,46 @@
+"""add note generation prompts
+
+Revision ID: a5c2e8f07b19
+Revises: e7a3b9c41d08
+Create Date: 2026-10-19 19:32:10.448215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c2e8f07b19'
+down_revision: Union[str, Sequence[str], None] = 'e7a3b9c41d08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Notes made by background jobs get their prompts back from the job row
+# (stored uncompressed, which CompressedText reads as is)
+POSTGRES_BACKFILL = (
+    "UPDATE notes SET prompt = convert_to(j.prompt, 'UTF8'), "
+    "system_prompt = convert_to(j.system_prompt, 'UTF8') "
+    "FROM generation_jobs j WHERE j.note_id = notes.id"
+)
+SQLITE_BACKFILL = (
+    "UPDATE notes SET "
+    "prompt = (SELECT CAST(j.prompt AS BLOB) FROM generation_jobs j WHERE j.note_id = notes.id), "
+    "system_prompt = (SELECT CAST(j.system_prompt AS BLOB) FROM generation_jobs j WHERE j.note_id = notes.id) "
+    "WHERE id IN (SELECT note_id FROM generation_jobs WHERE note_id IS NOT NULL)"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('notes', sa.Column('system_prompt', sa.LargeBinary(), nullable=True))
+    op.add_column('notes', sa.Column('prompt', sa.LargeBinary(), nullable=True))
+    dialect = op.get_bind().dialect.name
+    op.execute(sa.text(POSTGRES_BACKFILL if dialect == "postgresql" else SQLITE_BACKFILL))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('notes', 'prompt')
+    op.drop_column('notes', 'system_prompt')
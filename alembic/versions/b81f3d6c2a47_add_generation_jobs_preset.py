@@ -0,0 +1,28 @@
+"""add generation_jobs preset
+
+Revision ID: b81f3d6c2a47
+Revises: a5c2e8f07b19
+Create Date: 2026-10-19 21:05:37.219904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81f3d6c2a47'
+down_revision: Union[str, Sequence[str], None] = 'a5c2e8f07b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('generation_jobs', sa.Column('preset', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('generation_jobs', 'preset')
@@ -0,0 +1,50 @@
+"""add generation_jobs table
+
+Revision ID: c4d8a7e2f153
+Revises: 8b1e4f6a9c2d
+Create Date: 2026-10-19 12:20:05.871342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8a7e2f153'
+down_revision: Union[str, Sequence[str], None] = '8b1e4f6a9c2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('generation_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('system_prompt', sa.Text(), nullable=True),
+    sa.Column('prompt', sa.Text(), nullable=False),
+    sa.Column('temperature', sa.Float(), nullable=False),
+    sa.Column('max_tokens', sa.Integer(), nullable=False),
+    sa.Column('note_id', sa.Integer(), nullable=True),
+    sa.Column('cached', sa.Boolean(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['note_id'], ['notes.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_generation_jobs_status_created_at', 'generation_jobs', ['status', 'created_at'], unique=False)
+    op.create_index('ix_generation_jobs_owner_id', 'generation_jobs', ['owner_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_generation_jobs_owner_id', table_name='generation_jobs')
+    op.drop_index('ix_generation_jobs_status_created_at', table_name='generation_jobs')
+    op.drop_table('generation_jobs')
@@ -0,0 +1,28 @@
+"""add generation_jobs run_after
+
+Revision ID: d3e9a1b5f620
+Revises: b81f3d6c2a47
+Create Date: 2026-10-19 21:24:18.530671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3e9a1b5f620'
+down_revision: Union[str, Sequence[str], None] = 'b81f3d6c2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('generation_jobs', sa.Column('run_after', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('generation_jobs', 'run_after')
@@ -0,0 +1,196 @@
+"""compress note content and cards
+
+Revision ID: e7a3b9c41d08
+Revises: c4d8a7e2f153
+Create Date: 2026-10-19 13:41:52.603118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.compression import compress_text, decompress_text
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3b9c41d08'
+down_revision: Union[str, Sequence[str], None] = 'c4d8a7e2f153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows rewritten per batch, so no single statement holds every body in memory
+BATCH_SIZE = 1000
+
+# Postgres: the full-text index moves from an expression over the body to a
+# stored tsvector, then the bodies become bytea
+POSTGRES_UPGRADE = [
+    "UPDATE notes SET preview = left(content, 200), "
+    "search_vector = to_tsvector('english', coalesce(title, '') || ' ' || content)",
+    "UPDATE flashcard_decks SET search_vector = to_tsvector('english', topic || ' ' || cards::text)",
+    "DROP INDEX IF EXISTS ix_notes_search",
+    "DROP INDEX IF EXISTS ix_flashcard_decks_search",
+    "CREATE INDEX ix_notes_search_vector ON notes USING GIN (search_vector)",
+    "CREATE INDEX ix_flashcard_decks_search_vector ON flashcard_decks USING GIN (search_vector)",
+    "ALTER TABLE notes ALTER COLUMN content TYPE bytea USING convert_to(content, 'UTF8')",
+    "ALTER TABLE flashcard_decks ALTER COLUMN cards TYPE bytea USING convert_to(cards::text, 'UTF8')",
+]
+
+POSTGRES_DOWNGRADE = [
+    "ALTER TABLE flashcard_decks ALTER COLUMN cards TYPE json USING convert_from(cards, 'UTF8')::json",
+    "ALTER TABLE notes ALTER COLUMN content TYPE text USING convert_from(content, 'UTF8')",
+    "DROP INDEX IF EXISTS ix_flashcard_decks_search_vector",
+    "DROP INDEX IF EXISTS ix_notes_search_vector",
+    "CREATE INDEX ix_notes_search ON notes USING GIN "
+    "(to_tsvector('english', coalesce(title, '') || ' ' || content))",
+    "CREATE INDEX ix_flashcard_decks_search ON flashcard_decks USING GIN "
+    "(to_tsvector('english', topic || ' ' || cards::text))",
+]
+
+# SQLite: external-content FTS5 tables would read the compressed column
+# directly, so they become contentless tables fed with nn_decompress()
+# (registered on every connection by app.compression)
+SQLITE_DROP_FTS = [
+    "DROP TRIGGER IF EXISTS flashcard_decks_fts_au",
+    "DROP TRIGGER IF EXISTS flashcard_decks_fts_ad",
+    "DROP TRIGGER IF EXISTS flashcard_decks_fts_ai",
+    "DROP TABLE IF EXISTS flashcard_decks_fts",
+    "DROP TRIGGER IF EXISTS notes_fts_au",
+    "DROP TRIGGER IF EXISTS notes_fts_ad",
+    "DROP TRIGGER IF EXISTS notes_fts_ai",
+    "DROP TABLE IF EXISTS notes_fts",
+]
+
+SQLITE_UPGRADE_FTS = [
+    "CREATE VIRTUAL TABLE notes_fts USING fts5("
+    "title, content, content='', tokenize='porter unicode61')",
+    "CREATE TRIGGER notes_fts_ai AFTER INSERT ON notes BEGIN "
+    "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, nn_decompress(new.content)); END",
+    "CREATE TRIGGER notes_fts_ad AFTER DELETE ON notes BEGIN "
+    "INSERT INTO notes_fts(notes_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, nn_decompress(old.content)); END",
+    "CREATE TRIGGER notes_fts_au AFTER UPDATE OF title, content ON notes BEGIN "
+    "INSERT INTO notes_fts(notes_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, nn_decompress(old.content)); "
+    "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, nn_decompress(new.content)); END",
+    "INSERT INTO notes_fts(rowid, title, content) SELECT id, title, nn_decompress(content) FROM notes",
+
+    "CREATE VIRTUAL TABLE flashcard_decks_fts USING fts5("
+    "topic, cards, content='', tokenize='porter unicode61')",
+    "CREATE TRIGGER flashcard_decks_fts_ai AFTER INSERT ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(rowid, topic, cards) VALUES (new.id, new.topic, nn_decompress(new.cards)); END",
+    "CREATE TRIGGER flashcard_decks_fts_ad AFTER DELETE ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(flashcard_decks_fts, rowid, topic, cards) "
+    "VALUES ('delete', old.id, old.topic, nn_decompress(old.cards)); END",
+    "CREATE TRIGGER flashcard_decks_fts_au AFTER UPDATE OF topic, cards ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(flashcard_decks_fts, rowid, topic, cards) "
+    "VALUES ('delete', old.id, old.topic, nn_decompress(old.cards)); "
+    "INSERT INTO flashcard_decks_fts(rowid, topic, cards) VALUES (new.id, new.topic, nn_decompress(new.cards)); END",
+    "INSERT INTO flashcard_decks_fts(rowid, topic, cards) SELECT id, topic, nn_decompress(cards) FROM flashcard_decks",
+]
+
+# The external-content tables from 8b1e4f6a9c2d
+SQLITE_DOWNGRADE_FTS = [
+    "CREATE VIRTUAL TABLE notes_fts USING fts5("
+    "title, content, content='notes', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER notes_fts_ai AFTER INSERT ON notes BEGIN "
+    "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER notes_fts_ad AFTER DELETE ON notes BEGIN "
+    "INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER notes_fts_au AFTER UPDATE OF title, content ON notes BEGIN "
+    "INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')",
+
+    "CREATE VIRTUAL TABLE flashcard_decks_fts USING fts5("
+    "topic, cards, content='flashcard_decks', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER flashcard_decks_fts_ai AFTER INSERT ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(rowid, topic, cards) VALUES (new.id, new.topic, new.cards); END",
+    "CREATE TRIGGER flashcard_decks_fts_ad AFTER DELETE ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(flashcard_decks_fts, rowid, topic, cards) VALUES ('delete', old.id, old.topic, old.cards); END",
+    "CREATE TRIGGER flashcard_decks_fts_au AFTER UPDATE OF topic, cards ON flashcard_decks BEGIN "
+    "INSERT INTO flashcard_decks_fts(flashcard_decks_fts, rowid, topic, cards) VALUES ('delete', old.id, old.topic, old.cards); "
+    "INSERT INTO flashcard_decks_fts(rowid, topic, cards) VALUES (new.id, new.topic, new.cards); END",
+    "INSERT INTO flashcard_decks_fts(flashcard_decks_fts) VALUES ('rebuild')",
+]
+
+
+def _execute(statements: list) -> None:
+    for statement in statements:
+        op.execute(sa.text(statement))
+
+
+def _rewrite(table: str, column: str, convert) -> None:
+    """Apply `convert` to every value of `column`, BATCH_SIZE rows at a time."""
+    bind = op.get_bind()
+    select = sa.text(f"SELECT id, {column} FROM {table} WHERE id > :last ORDER BY id LIMIT :limit")
+    update = sa.text(f"UPDATE {table} SET {column} = :value WHERE id = :id")
+    last = 0
+    while True:
+        rows = bind.execute(select, {"last": last, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        changed = []
+        for row_id, value in rows:
+            new_value = convert(value)
+            if new_value != value:
+                changed.append({"id": row_id, "value": new_value})
+        if changed:
+            bind.execute(update, changed)
+        last = rows[-1][0]
+
+
+def _compress(value):
+    if value is None:
+        return None
+    text = decompress_text(value)
+    packed = compress_text(text)
+    # Values below the size threshold are left exactly as they were
+    return value if packed == text.encode("utf-8") else packed
+
+
+def _decompress_to_bytes(value):
+    return None if value is None else decompress_text(value).encode("utf-8")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    vector_type = postgresql.TSVECTOR() if dialect == "postgresql" else sa.Text()
+    op.add_column('notes', sa.Column('preview', sa.String(length=200), nullable=True))
+    op.add_column('notes', sa.Column('search_vector', vector_type, nullable=True))
+    op.add_column('flashcard_decks', sa.Column('search_vector', vector_type, nullable=True))
+
+    if dialect == "postgresql":
+        _execute(POSTGRES_UPGRADE)
+    else:
+        _execute(SQLITE_DROP_FTS)
+        op.execute(sa.text("UPDATE notes SET preview = substr(content, 1, 200)"))
+
+    _rewrite('notes', 'content', _compress)
+    _rewrite('flashcard_decks', 'cards', _compress)
+
+    if dialect == "sqlite":
+        _execute(SQLITE_UPGRADE_FTS)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Still bytea here; POSTGRES_DOWNGRADE converts back to text/json
+        _rewrite('notes', 'content', _decompress_to_bytes)
+        _rewrite('flashcard_decks', 'cards', _decompress_to_bytes)
+        _execute(POSTGRES_DOWNGRADE)
+    else:
+        _execute(SQLITE_DROP_FTS)
+        _rewrite('notes', 'content', decompress_text)
+        _rewrite('flashcard_decks', 'cards', decompress_text)
+
+    op.drop_column('flashcard_decks', 'search_vector')
+    op.drop_column('notes', 'search_vector')
+    op.drop_column('notes', 'preview')
+
+    if dialect == "sqlite":
+        _execute(SQLITE_DOWNGRADE_FTS)
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from app.config import settings
+from app.shared_state import SharedRateLimiter
+
+
+class RateLimited(Exception):
+    """Raised when a user is over their generation quota.
+
+    `user_id` is set when the wait for a slot timed out, so a coalesced
+    call can tell whose queue it was stuck in.
+    """
+
+    def __init__(self, detail: str, retry_after: float, user_id: int | None = None):
+        super().__init__(detail)
+        self.retry_after = retry_after
+        self.user_id = user_id
+
+
+class TokenBucket:
+    """Allows `capacity` requests at once, refilled at `rate` per second."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Take one token; returns 0 on success, else seconds until one is free."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class FairScheduler:
+    """Per-user admission control and round-robin dispatch for generations.
+
+    `admit` applies each user's token bucket and queue bound at the door.
+    `slot` then waits for a free generation slot: at most `max_concurrent`
+    run globally and `max_per_user` per user, and waiting users are served
+    round-robin, so one user with a deep queue cannot starve the others.
+
+    With a `shared` limiter the token buckets live in a store every worker
+    process uses, so the quota holds across workers; queue bounds and slots
+    stay per process.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = settings.GEN_MAX_CONCURRENT,
+        max_per_user: int = settings.GEN_MAX_CONCURRENT_PER_USER,
+        max_queued_per_user: int = settings.GEN_MAX_QUEUED_PER_USER,
+        rate_per_minute: float = settings.GEN_RATE_PER_MINUTE,
+        burst: int = settings.GEN_BURST,
+        queue_timeout: float = settings.GEN_QUEUE_TIMEOUT_SECONDS,
+        shared: SharedRateLimiter | None = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queued_per_user = max_queued_per_user
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self.shared = shared
+
+        self._buckets: dict[int, TokenBucket] = {}
+        # user id -> waiting futures; dict order is the round-robin order
+        self._waiting: OrderedDict[int, deque[asyncio.Future]] = OrderedDict()
+        self._active: Counter[int] = Counter()
+        self._active_total = 0
+
+        # Metrics
+        self.admitted = 0
+        self.rate_limited = 0
+        self.queue_full = 0
+        self.queue_timeouts = 0
+
+    async def admit(self, user_id: int):
+        if self.shared:
+            wait = await self.shared.take(f"gen:{user_id}", self.burst, self.rate)
+        else:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                if len(self._buckets) > 10000:
+                    self._prune_buckets()
+                bucket = self._buckets[user_id] = TokenBucket(self.burst, self.rate)
+            wait = bucket.take()
+        if wait:
+            self.rate_limited += 1
+            raise RateLimited("Generation rate limit exceeded", retry_after=wait)
+
+        if len(self._waiting.get(user_id, ())) >= self.max_queued_per_user:
+            # Hand the token back: this request never ran
+            if self.shared:
+                await self.shared.give_back(f"gen:{user_id}", self.burst)
+            else:
+                bucket.tokens += 1
+            self.queue_full += 1
+            raise RateLimited("Too many generations queued", retry_after=2)
+
+        self.admitted += 1
+
+    @asynccontextmanager
+    async def slot(self, user_id: int):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_id, deque()).append(waiter)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we gave up: hand the slot back
+                self._release(user_id)
+            else:
+                waiter.cancel()
+                self._forget(user_id, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.queue_timeouts += 1
+                raise RateLimited("Generation queue is full, try again shortly", retry_after=5, user_id=user_id)
+            raise
+
+        try:
+            yield
+        finally:
+            self._release(user_id)
+
+    def _dispatch(self):
+        progressed = True
+        while progressed and self._active_total < self.max_concurrent:
+            progressed = False
+            for user_id in list(self._waiting):
+                if self._active_total >= self.max_concurrent:
+                    break
+                if self._active[user_id] >= self.max_per_user:
+                    continue
+                queue = self._waiting[user_id]
+                waiter = queue.popleft()
+                if not queue:
+                    del self._waiting[user_id]
+                else:
+                    # Served: go to the back of the round-robin order
+                    self._waiting.move_to_end(user_id)
+                if waiter.cancelled():
+                    progressed = True
+                    continue
+                waiter.set_result(None)
+                self._active[user_id] += 1
+                self._active_total += 1
+                progressed = True
+
+    def _release(self, user_id: int):
+        self._active[user_id] -= 1
+        if self._active[user_id] <= 0:
+            del self._active[user_id]
+        self._active_total -= 1
+        self._dispatch()
+
+    def _forget(self, user_id: int, waiter: asyncio.Future):
+        queue = self._waiting.get(user_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiting[user_id]
+
+    def _prune_buckets(self):
+        for user_id in [u for u, b in self._buckets.items() if b.full]:
+            del self._buckets[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "active": self._active_total,
+            "max_concurrent": self.max_concurrent,
+            "queued": sum(len(q) for q in self._waiting.values()),
+            "users_waiting": len(self._waiting),
+            "admitted": self.admitted,
+            "rate_limited": self.rate_limited,
+            "queue_full": self.queue_full,
+            "queue_timeouts": self.queue_timeouts,
+            "shared_errors": self.shared.errors if self.shared else 0,
+        }
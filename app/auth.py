@@ -1,26 +1,27 @@
+import threading
+import time
 from datetime import datetime, timedelta
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt, ExpiredSignatureError
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.config import settings
 from app.dependencies import get_db
 from app import models
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def token_claims(user: models.User) -> dict:
+    claims = {"sub": user.email}
+    if settings.AUTH_TOKEN_EMBED_USER_ID:
+        # Lets get_current_user look the user up by primary key
+        claims["uid"] = user.id
+    return claims
 
 
 def create_access_token(data: dict) -> str:
@@ -36,9 +37,71 @@ def create_access_token(data: dict) -> str:
     )
 
 
-def get_current_user(
+class UserCache:
+    """Short-lived, in-process cache of users keyed by token subject.
+
+    Entries are detached copies of the row; `get_current_user` merges them
+    into the request's session without emitting a SELECT.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[float, models.User]] = {}
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, subject: str) -> models.User | None:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(subject, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, subject: str, user: models.User):
+        snapshot = models.User(**{
+            column.key: getattr(user, column.key)
+            for column in models.User.__table__.columns
+        })
+        make_transient_to_detached(snapshot)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, snapshot)
+
+    def invalidate(self, user: models.User):
+        with self._lock:
+            for subject in (user.email, str(user.id)):
+                self._entries.pop(subject, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+user_cache = UserCache(ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+# Any flushed change to a user (password change, deactivation, ...) drops
+# the cached copy in this process; other workers catch up within the TTL
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.invalidate(target)
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,6 +117,7 @@ def get_current_user(
         )
 
         email: str | None = payload.get("sub")
+        user_id: int | None = payload.get("uid")
         if email is None:
             raise credentials_exception
 
@@ -67,8 +131,17 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.email == email).first()
+    subject = str(user_id) if user_id is not None else email
+    cached = user_cache.get(subject)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+
+    if user_id is not None:
+        user = await db.get(models.User, user_id)
+    else:
+        user = await db.scalar(select(models.User).where(models.User.email == email))
     if user is None:
         raise credentials_exception
 
+    user_cache.set(subject, user)
     return user
@@ -0,0 +1,195 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import xxhash
+
+from app.config import settings
+
+
+class ResponseCache:
+    """Two-tier cache for generated LLM responses.
+
+    Tier 1 is an in-process LRU bounded by entry count and total bytes.
+    Tier 2 (optional, enabled by giving a `path`) is a SQLite file that
+    every worker on the machine can share. Both tiers expire entries
+    after `ttl_seconds`. Disk reads and writes run on one worker thread,
+    off the event loop; writes aren't waited for, and a locked or broken
+    file counts as a miss.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = settings.LLM_CACHE_MAX_BYTES,
+        ttl_seconds: float = settings.LLM_CACHE_TTL_SECONDS,
+        path: str | None = settings.LLM_CACHE_PATH,
+        max_disk_entries: int = settings.LLM_CACHE_MAX_DISK_ENTRIES,
+        cache_sampled: bool = settings.LLM_CACHE_SAMPLED,
+        busy_timeout: float = settings.SHARED_STATE_BUSY_TIMEOUT_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.cache_sampled = cache_sampled
+
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self._db = None
+        self._executor = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(
+                path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="llm-cache")
+        self._disk_writes = 0
+
+        # Metrics
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_errors = 0
+
+    @staticmethod
+    def make_key(
+        model: str,
+        system_prompt: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        raw = json.dumps(
+            [model, system_prompt, prompt, temperature, max_tokens],
+            ensure_ascii=False,
+        )
+        return xxhash.xxh3_128_hexdigest(raw.encode("utf-8"))
+
+    def cacheable(self, temperature: float) -> bool:
+        return temperature <= 0 or self.cache_sampled
+
+    async def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+
+        if self._executor is not None:
+            try:
+                row = await asyncio.wrap_future(self._executor.submit(self._disk_get, key))
+            except sqlite3.Error:
+                self.disk_errors += 1
+                row = None
+            if row is not None and row[1] > now:
+                with self._lock:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, value, expires_at)
+
+        if self._executor is not None:
+            self._executor.submit(self._disk_set, key, value, expires_at)
+
+    def _disk_get(self, key: str) -> tuple[str, float] | None:
+        with self._db_lock:
+            return self._db.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+    def _disk_set(self, key: str, value: str, expires_at: float):
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at)"
+                    " VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._disk_writes += 1
+                if self._disk_writes % 256 == 0:
+                    self._prune_disk()
+        except sqlite3.Error:
+            self.disk_errors += 1
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (expires_at, value)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _prune_disk(self):
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+        # Still over the limit: drop the oldest writes (soonest to expire)
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE key IN ("
+            " SELECT key FROM llm_cache ORDER BY expires_at DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "disk_errors": self.disk_errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            # Let queued writes finish first
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
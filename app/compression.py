@@ -0,0 +1,143 @@
+import json
+import zlib
+
+from sqlalchemy import LargeBinary, Text, event
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import TypeDecorator
+
+from app.config import settings
+
+try:
+    import zstandard
+except ImportError:   # optional: zlib is used instead
+    zstandard = None
+
+# Compressed values start with NUL + codec; text never contains NUL, so
+# anything else is a plain UTF-8 value (short, or written before compression)
+ZLIB_MAGIC = b"\x00z"
+ZSTD_MAGIC = b"\x00s"
+
+
+def _codec() -> str:
+    codec = settings.STORAGE_COMPRESSION
+    if codec == "zstd" and zstandard is None:
+        return "zlib"
+    return codec
+
+
+_zstd_compressor = None
+_zstd_decompressor = None
+
+
+def compress_text(text: str) -> bytes:
+    raw = text.encode("utf-8")
+    codec = _codec()
+    if codec == "none" or len(raw) < settings.STORAGE_COMPRESS_MIN_BYTES:
+        return raw
+
+    global _zstd_compressor
+    if codec == "zstd":
+        if _zstd_compressor is None:
+            _zstd_compressor = zstandard.ZstdCompressor(level=settings.STORAGE_COMPRESS_LEVEL or 3)
+        packed = ZSTD_MAGIC + _zstd_compressor.compress(raw)
+    else:
+        packed = ZLIB_MAGIC + zlib.compress(raw, settings.STORAGE_COMPRESS_LEVEL or 6)
+    # Incompressible text is kept as is
+    return packed if len(packed) < len(raw) else raw
+
+
+def decompress_text(value: bytes | memoryview | str | None) -> str | None:
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value.startswith(ZSTD_MAGIC):
+        global _zstd_decompressor
+        if zstandard is None:
+            raise RuntimeError("Stored value is zstd-compressed; install zstandard to read it")
+        if _zstd_decompressor is None:
+            _zstd_decompressor = zstandard.ZstdDecompressor()
+        return _zstd_decompressor.decompress(value[len(ZSTD_MAGIC):]).decode("utf-8")
+    if value.startswith(ZLIB_MAGIC):
+        return zlib.decompress(value[len(ZLIB_MAGIC):]).decode("utf-8")
+    return value.decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """Text stored compressed once it reaches STORAGE_COMPRESS_MIN_BYTES."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else compress_text(value)
+
+    def result_processor(self, dialect, coltype):
+        # Skip LargeBinary's own processor: rows written before the backfill
+        # can still come back from SQLite as str
+        return lambda value: decompress_text(value)
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as compressed text."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress_text(json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            text = decompress_text(value)
+            return None if text is None else json.loads(text)
+        return process
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    # The SQLite full-text triggers index the decompressed text
+    if hasattr(dbapi_connection, "create_function") and "sqlite" in type(dbapi_connection).__module__.lower():
+        dbapi_connection.create_function("nn_decompress", 1, decompress_text, deterministic=True)
+
+
+class to_search_vector(FunctionElement):
+    inherit_cache = True
+
+
+@compiles(to_search_vector)
+def _compile_to_search_vector(element, compiler, **kw):
+    # Only Postgres keeps a stored tsvector; elsewhere the column stays NULL
+    return "NULL"
+
+
+@compiles(to_search_vector, "postgresql")
+def _compile_to_search_vector_postgresql(element, compiler, **kw):
+    return f"to_tsvector('english', {compiler.process(element.clauses, **kw)})"
+
+
+class SearchVector(TypeDecorator):
+    """Postgres tsvector written from plain text.
+
+    Note bodies are compressed, so the full-text index can't be an
+    expression over the content column any more; the vector is computed
+    from the text at write time instead.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(TSVECTOR())
+        return dialect.type_descriptor(Text())
+
+    def bind_expression(self, bindvalue):
+        return to_search_vector(bindvalue)
+
+    def process_result_value(self, value, dialect):
+        return None
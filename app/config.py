@@ -6,8 +6,115 @@ load_dotenv()
 class Settings:
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY")
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # Defaults to DATABASE_URL with the asyncpg / aiosqlite driver swapped in
+    ASYNC_DATABASE_URL: str | None = os.getenv("ASYNC_DATABASE_URL") or None
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 10))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 15000))
     SECRET_KEY: str = os.getenv("SECRET_KEY")
     ALGORITHM: str = os.getenv("ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 10))
+    AUTH_USER_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", 30))
+    AUTH_TOKEN_EMBED_USER_ID: bool = os.getenv("AUTH_TOKEN_EMBED_USER_ID", "true").lower() == "true"
+
+    # Note bodies and flashcard payloads: "zstd" (falls back to zlib), "zlib" or "none"
+    STORAGE_COMPRESSION: str = os.getenv("STORAGE_COMPRESSION", "zstd").lower()
+    STORAGE_COMPRESS_MIN_BYTES: int = int(os.getenv("STORAGE_COMPRESS_MIN_BYTES", 256))
+    # 0 uses the codec's default (zstd 3, zlib 6)
+    STORAGE_COMPRESS_LEVEL: int = int(os.getenv("STORAGE_COMPRESS_LEVEL", 0))
+
+    # Streaming export / import: rows per cursor fetch and per import transaction
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+    IMPORT_MAX_LINE_BYTES: int = int(os.getenv("IMPORT_MAX_LINE_BYTES", 8 * 1024 * 1024))
+    # Upload size, and for zips the total unpacked size and member count
+    IMPORT_MAX_BYTES: int = int(os.getenv("IMPORT_MAX_BYTES", 256 * 1024 * 1024))
+    IMPORT_MAX_UNZIPPED_BYTES: int = int(os.getenv("IMPORT_MAX_UNZIPPED_BYTES", 1024 * 1024 * 1024))
+    IMPORT_MAX_ZIP_ENTRIES: int = int(os.getenv("IMPORT_MAX_ZIP_ENTRIES", 16))
+
+    # Write-behind persistence of generated notes (Postgres only; serve.py
+    # turns it off when running more than one worker)
+    NOTE_WRITE_BEHIND: bool = os.getenv("NOTE_WRITE_BEHIND", "true").lower() == "true"
+    NOTE_WRITE_BATCH_SIZE: int = int(os.getenv("NOTE_WRITE_BATCH_SIZE", 100))
+    NOTE_WRITE_INTERVAL_MS: float = float(os.getenv("NOTE_WRITE_INTERVAL_MS", 50))
+    NOTE_WRITE_MAX_PENDING: int = int(os.getenv("NOTE_WRITE_MAX_PENDING", 5000))
+    NOTE_ID_BLOCK_SIZE: int = int(os.getenv("NOTE_ID_BLOCK_SIZE", 100))
+
+    # Password hashing pool
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", 12))
+    BCRYPT_WORKERS: int = int(os.getenv("BCRYPT_WORKERS", 2))
+    BCRYPT_MAX_PENDING: int = int(os.getenv("BCRYPT_MAX_PENDING", 32))
+
+    # LLM gateway
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", 120))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", 30))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 3))
+
+    # Per-user admission control and fair queueing for /generate
+    GEN_RATE_PER_MINUTE: float = float(os.getenv("GEN_RATE_PER_MINUTE", 30))
+    GEN_BURST: int = int(os.getenv("GEN_BURST", 10))
+    GEN_MAX_CONCURRENT: int = int(os.getenv("GEN_MAX_CONCURRENT", 32))
+    GEN_MAX_CONCURRENT_PER_USER: int = int(os.getenv("GEN_MAX_CONCURRENT_PER_USER", 2))
+    GEN_MAX_QUEUED_PER_USER: int = int(os.getenv("GEN_MAX_QUEUED_PER_USER", 4))
+    GEN_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("GEN_QUEUE_TIMEOUT_SECONDS", 60))
+    # SQLite file holding the generation quotas, shared by all worker processes
+    # (set by serve.py); unset keeps them in process memory
+    SHARED_STATE_PATH: str | None = os.getenv("SHARED_STATE_PATH") or None
+    # How long a shared SQLite file (quotas, response cache) may stay locked
+    # before the call gives up and fails open
+    SHARED_STATE_BUSY_TIMEOUT_SECONDS: float = float(os.getenv("SHARED_STATE_BUSY_TIMEOUT_SECONDS", 0.5))
+
+    # Response cache for /generate
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024))
+    LLM_CACHE_MAX_BYTES: int = int(os.getenv("LLM_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", 24 * 60 * 60))
+    LLM_CACHE_PATH: str | None = os.getenv("LLM_CACHE_PATH") or None
+    LLM_CACHE_MAX_DISK_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_DISK_ENTRIES", 100000))
+    # Set to false to only cache deterministic (temperature 0) generations
+    LLM_CACHE_SAMPLED: bool = os.getenv("LLM_CACHE_SAMPLED", "true").lower() == "true"
+
+    # Near-duplicate matching on top of the exact cache, for requests naming a preset
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+    # JSON object of preset -> threshold; 1 or more turns matching off for a preset
+    SEMANTIC_CACHE_THRESHOLDS: str = os.getenv(
+        "SEMANTIC_CACHE_THRESHOLDS", '{"code": 0.99, "math": 0.99, "custom": 1}')
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 5000))
+    SEMANTIC_CACHE_DIM: int = int(os.getenv("SEMANTIC_CACHE_DIM", 1024))
+
+    # Fraction of generations whose system prompt is logged (0 disables)
+    PROMPT_LOG_SAMPLE_RATE: float = float(os.getenv("PROMPT_LOG_SAMPLE_RATE", 0))
+    # If set, /metrics requires "Authorization: Bearer <token>"
+    METRICS_TOKEN: str | None = os.getenv("METRICS_TOKEN") or None
+
+    # gzip for API responses at least this large
+    RESPONSE_GZIP_MIN_BYTES: int = int(os.getenv("RESPONSE_GZIP_MIN_BYTES", 1024))
+    RESPONSE_GZIP_LEVEL: int = int(os.getenv("RESPONSE_GZIP_LEVEL", 5))
+
+    # Prompts estimated above LONG_INPUT_TOKENS are summarised map-reduce style
+    LONG_INPUT_TOKENS: int = int(os.getenv("LONG_INPUT_TOKENS", 6000))
+    SUMMARY_CHUNK_TOKENS: int = int(os.getenv("SUMMARY_CHUNK_TOKENS", 3000))
+    SUMMARY_CHUNK_OVERLAP_TOKENS: int = int(os.getenv("SUMMARY_CHUNK_OVERLAP_TOKENS", 150))
+    SUMMARY_PART_MAX_TOKENS: int = int(os.getenv("SUMMARY_PART_MAX_TOKENS", 600))
+    SUMMARY_MAX_PARALLEL: int = int(os.getenv("SUMMARY_MAX_PARALLEL", 4))
+
+    # Background generation jobs
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", 4))
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", 2))
+    # A running job not finished within the lease is assumed lost and requeued
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", 600))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+    # A transiently failed job waits base * 2^(attempt - 1) seconds, up to max
+    JOB_RETRY_BASE_SECONDS: float = float(os.getenv("JOB_RETRY_BASE_SECONDS", 5))
+    JOB_RETRY_MAX_SECONDS: float = float(os.getenv("JOB_RETRY_MAX_SECONDS", 300))
+    JOB_MAX_PENDING_PER_USER: int = int(os.getenv("JOB_MAX_PENDING_PER_USER", 20))
+    JOB_MAX_WAIT_SECONDS: float = float(os.getenv("JOB_MAX_WAIT_SECONDS", 30))
 
 settings = Settings()
@@ -1,16 +1,84 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.metrics import instrument_engine
 
+
+def async_database_url(url: str) -> str:
+    """Point a plain database URL at the matching async driver."""
+    for sync_prefix, async_prefix in (
+        ("postgresql://", "postgresql+asyncpg://"),
+        ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+        ("sqlite://", "sqlite+aiosqlite://"),
+    ):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+def engine_options(url: str, is_async: bool) -> dict:
+    options = {"echo": False, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if url.startswith("sqlite"):
+        # SQLite has no server-side pool or statement timeout to tune
+        return options
+
+    options.update(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.startswith("postgresql"):
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+# Sync engine: migrations, scripts and anything outside the request path
 engine = create_engine(
     settings.DATABASE_URL,
-    echo=False
+    **engine_options(settings.DATABASE_URL, is_async=False),
 )
 
+instrument_engine(engine)
+
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
     bind=engine
 )
 
+# Async engine: used by the route handlers
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, is_async=True),
+)
+
+instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    # Handlers read attributes after commit; don't force a reload per object
+    expire_on_commit=False,
+)
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
 Base = declarative_base()
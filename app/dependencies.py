@@ -1,9 +1,10 @@
-from app.database import SessionLocal
-from typing import Generator
+from app.database import AsyncSessionLocal
+from typing import AsyncGenerator
 
-def get_db() -> Generator:
-    db = SessionLocal()
-    try:
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
@@ -0,0 +1,336 @@
+import asyncio
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import models, schemas
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+EXPORT_FORMAT = "neuronotes-export"
+EXPORT_VERSION = 1
+
+# Uploaded archives spill from memory to disk past this size
+ZIP_SPOOL_BYTES = 1024 * 1024
+# Unpacked lines are handed back from the reader thread in batches of about this size
+ZIP_READ_BATCH_BYTES = 1024 * 1024
+
+
+class ImportFailed(Exception):
+    """Raised for an import line that can't be read; earlier batches stay committed."""
+
+
+class ImportTooLarge(ImportFailed):
+    """Raised when an upload goes past the import size limits."""
+
+
+def _line(record: dict) -> bytes:
+    return orjson.dumps(record) + b"\n"
+
+
+def meta_line() -> bytes:
+    return _line({
+        "type": "meta",
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "exported_at": datetime.now(timezone.utc),
+    })
+
+
+async def note_lines(
+    owner_id: int,
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    batch_size: int = settings.EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """The user's notes as NDJSON, one chunk per `batch_size` rows.
+
+    Rows come from a server-side cursor, so only one batch is ever in
+    memory. The generator opens its own session: it runs while the
+    response streams, after the request's session is gone.
+    """
+    async with session_factory() as db:
+        result = await db.stream(
+            select(
+                models.Note.title,
+                models.Note.content,
+                models.Note.created_at,
+                models.Note.is_bookmarked,
+            )
+            .where(models.Note.owner_id == owner_id)
+            .order_by(models.Note.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in result.partitions():
+            yield b"".join(_line({
+                "type": "note",
+                "title": row.title,
+                "content": row.content,
+                "created_at": row.created_at,
+                "is_bookmarked": bool(row.is_bookmarked),
+            }) for row in rows)
+
+
+async def deck_lines(
+    owner_id: int,
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+    batch_size: int = settings.EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """The user's flashcard decks as NDJSON, like `note_lines`."""
+    async with session_factory() as db:
+        result = await db.stream(
+            select(
+                models.FlashcardDeck.topic,
+                models.FlashcardDeck.difficulty,
+                models.FlashcardDeck.cards,
+                models.FlashcardDeck.saved_at,
+            )
+            .where(models.FlashcardDeck.owner_id == owner_id)
+            .order_by(models.FlashcardDeck.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in result.partitions():
+            yield b"".join(_line({
+                "type": "deck",
+                "topic": row.topic,
+                "difficulty": row.difficulty,
+                "cards": row.cards,
+                "saved_at": row.saved_at,
+            }) for row in rows)
+
+
+async def export_ndjson(owner_id: int) -> AsyncIterator[bytes]:
+    yield meta_line()
+    async for chunk in note_lines(owner_id):
+        yield chunk
+    async for chunk in deck_lines(owner_id):
+        yield chunk
+
+
+class _Sink:
+    """Write-only file for ZipFile; what's written is taken out with drain().
+
+    It has no tell()/seek(), so ZipFile writes in streaming mode (sizes in
+    data descriptors after each member) and never goes back.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def export_zip(owner_id: int) -> AsyncIterator[bytes]:
+    """A zip of meta.json, notes.ndjson and decks.ndjson, built while streaming."""
+    sink = _Sink()
+    now = datetime.now(timezone.utc).timetuple()[:6]
+    members = (
+        ("meta.json", None),
+        ("notes.ndjson", note_lines(owner_id)),
+        ("decks.ndjson", deck_lines(owner_id)),
+    )
+    with zipfile.ZipFile(sink, "w") as archive:
+        for name, chunks in members:
+            info = zipfile.ZipInfo(name, date_time=now)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # Sizes aren't known up front, so allow members past 4 GB
+            with archive.open(info, "w", force_zip64=True) as member:
+                if chunks is None:
+                    member.write(meta_line())
+                    continue
+                async for chunk in chunks:
+                    member.write(chunk)
+                    yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
+
+
+async def limited(
+    chunks: AsyncIterator[bytes],
+    max_bytes: int = settings.IMPORT_MAX_BYTES,
+) -> AsyncIterator[bytes]:
+    """Pass the request body through, failing once it exceeds `max_bytes`."""
+    total = 0
+    async for chunk in chunks:
+        total += len(chunk)
+        if total > max_bytes:
+            raise ImportTooLarge(f"Upload is larger than {max_bytes} bytes")
+        yield chunk
+
+
+async def body_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = settings.IMPORT_MAX_LINE_BYTES,
+) -> AsyncIterator[bytes]:
+    """Split a streamed request body into lines, holding at most one partial line."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > max_line_bytes:
+            raise ImportFailed(f"A line is longer than {max_line_bytes} bytes")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def _member_lines(
+    archive: zipfile.ZipFile,
+    max_line_bytes: int,
+    max_unzipped_bytes: int,
+    max_entries: int,
+) -> Iterator[list[bytes]]:
+    """Blocking: the lines of every .ndjson member, in batches of about
+    ZIP_READ_BATCH_BYTES. The unpacked size is checked against the index
+    up front and counted again while reading, since the index can lie."""
+    members = sorted(
+        (info for info in archive.infolist() if info.filename.endswith(".ndjson")),
+        key=lambda info: info.filename,
+    )
+    if len(archive.infolist()) > max_entries:
+        raise ImportTooLarge(f"Archive has more than {max_entries} entries")
+    if sum(info.file_size for info in members) > max_unzipped_bytes:
+        raise ImportTooLarge(f"Archive unpacks to more than {max_unzipped_bytes} bytes")
+    unzipped = 0
+    batch, batch_bytes = [], 0
+    for info in members:
+        with archive.open(info) as member:
+            while line := member.readline(max_line_bytes + 1):
+                if len(line) > max_line_bytes:
+                    raise ImportFailed(f"A line in {info.filename} is longer than {max_line_bytes} bytes")
+                unzipped += len(line)
+                if unzipped > max_unzipped_bytes:
+                    raise ImportTooLarge(f"Archive unpacks to more than {max_unzipped_bytes} bytes")
+                batch.append(line)
+                batch_bytes += len(line)
+                if batch_bytes >= ZIP_READ_BATCH_BYTES:
+                    yield batch
+                    batch, batch_bytes = [], 0
+    if batch:
+        yield batch
+
+
+async def zip_lines(
+    chunks: AsyncIterator[bytes],
+    max_line_bytes: int = settings.IMPORT_MAX_LINE_BYTES,
+    max_unzipped_bytes: int = settings.IMPORT_MAX_UNZIPPED_BYTES,
+    max_entries: int = settings.IMPORT_MAX_ZIP_ENTRIES,
+) -> AsyncIterator[bytes]:
+    """Lines of every .ndjson member of an uploaded export zip.
+
+    A zip's index is at its end, so the upload is spooled first (to disk
+    once past ZIP_SPOOL_BYTES; pass the body through `limited`); members
+    are then read a line at a time. Spooling and inflating are blocking
+    file and CPU work, so both run in a thread.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_BYTES) as spool:
+        async for chunk in chunks:
+            await asyncio.to_thread(spool.write, chunk)
+        spool.seek(0)
+        try:
+            archive = await asyncio.to_thread(zipfile.ZipFile, spool)
+        except zipfile.BadZipFile:
+            raise ImportFailed("Not a valid zip archive")
+        with archive:
+            batches = _member_lines(archive, max_line_bytes, max_unzipped_bytes, max_entries)
+            while batch := await asyncio.to_thread(next, batches, None):
+                for line in batch:
+                    yield line
+
+
+def _note_row(owner_id: int, record: schemas.ExportedNote, now: datetime) -> dict:
+    return {
+        "owner_id": owner_id,
+        "title": record.title,
+        "content": record.content,
+        # Every row of one executemany needs the same keys, so there's no
+        # leaving created_at to the server default
+        "created_at": record.created_at or now,
+        "is_bookmarked": record.is_bookmarked,
+    }
+
+
+def _deck_row(owner_id: int, record: schemas.ExportedDeck, now: datetime) -> dict:
+    return {
+        "owner_id": owner_id,
+        "topic": record.topic,
+        "difficulty": record.difficulty,
+        "count": len(record.cards),
+        "cards": record.cards,
+        "saved_at": record.saved_at or now,
+    }
+
+
+async def import_lines(
+    db: AsyncSession,
+    owner_id: int,
+    lines: AsyncIterator[bytes],
+    batch_size: int = settings.IMPORT_BATCH_SIZE,
+) -> dict:
+    """Insert exported notes and decks, committing every `batch_size` records.
+
+    Blank and "meta" lines are skipped. On a bad line ImportFailed is
+    raised; the batches before it are already committed.
+    """
+    counts = {"notes": 0, "decks": 0}
+    notes, decks = [], []
+    now = datetime.now(timezone.utc)
+
+    async def flush():
+        if notes:
+            await db.execute(insert(models.Note), notes)
+        if decks:
+            await db.execute(insert(models.FlashcardDeck), decks)
+        await db.commit()
+        counts["notes"] += len(notes)
+        counts["decks"] += len(decks)
+        notes.clear()
+        decks.clear()
+
+    number = 0
+    try:
+        async for line in lines:
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                record = orjson.loads(line)
+                kind = record.get("type") if isinstance(record, dict) else None
+                if kind == "note":
+                    notes.append(_note_row(owner_id, schemas.ExportedNote.model_validate(record), now))
+                elif kind == "deck":
+                    decks.append(_deck_row(owner_id, schemas.ExportedDeck.model_validate(record), now))
+                elif kind != "meta":
+                    raise ImportFailed(f"Line {number}: unknown record type {kind!r}")
+            except orjson.JSONDecodeError as e:
+                raise ImportFailed(f"Line {number}: invalid JSON ({e})")
+            except ValidationError as e:
+                problems = "; ".join(
+                    f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+                raise ImportFailed(f"Line {number}: {problems}")
+
+            if len(notes) + len(decks) >= batch_size:
+                await flush()
+        await flush()
+    except ImportFailed as e:
+        await db.rollback()
+        # Same type, so the route can still tell a size limit from bad data
+        raise type(e)(
+            f"{e} ({counts['notes']} notes and {counts['decks']} decks before it were imported)")
+    return counts
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import random
+from contextlib import nullcontext
+
+from app import models
+from app.admission import FairScheduler, RateLimited
+from app.cache import ResponseCache
+from app.llm import LLMGateway
+from app.config import settings
+from app.semantic_cache import SemanticCache
+from app.singleflight import SingleFlight
+from app.summarize import estimate_tokens, map_reduce
+
+DEFAULT_SYSTEM_PROMPT = "You are NeuroNotes Pro."
+
+# Prompts are only logged for a sample of generations; printing every one
+# costs real I/O under load
+prompt_logger = logging.getLogger("neuronotes.prompts")
+if not prompt_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    prompt_logger.addHandler(_handler)
+    prompt_logger.setLevel(logging.INFO)
+    prompt_logger.propagate = False
+
+
+def log_prompt_sample(user_id: int, system_prompt: str | None):
+    rate = settings.PROMPT_LOG_SAMPLE_RATE
+    if rate > 0 and random.random() < rate:
+        prompt_logger.info("user=%s system_prompt=%r", user_id, system_prompt)
+
+
+class Generator:
+    """The cache -> coalescing -> fair slot -> LLM pipeline behind a generation.
+
+    Shared by /generate and the background job workers so both get the
+    same caching, deduplication and per-user fairness. Admission
+    (`FairScheduler.admit`) stays with the caller, since it happens at
+    request time even when the generation itself runs later. Prompts
+    too long for one call go through the map-reduce path in app/summarize.py.
+    """
+
+    def __init__(
+        self,
+        llm: LLMGateway,
+        scheduler: FairScheduler,
+        flights: SingleFlight,
+        cache: ResponseCache | None = None,
+        semantic: SemanticCache | None = None,
+    ):
+        self.llm = llm
+        self.scheduler = scheduler
+        self.flights = flights
+        self.cache = cache
+        self.semantic = semantic
+
+    async def generate(
+        self,
+        user_id: int,
+        system_prompt: str | None,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        preset: str | None = None,
+    ) -> tuple[str, bool]:
+        """Returns the generated text and whether it came from the cache.
+
+        `preset` opts the request into near-duplicate matching with that
+        preset's similarity threshold.
+        """
+        log_prompt_sample(user_id, system_prompt)
+        system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
+
+        if estimate_tokens(prompt) > settings.LONG_INPUT_TOKENS:
+            # Too long for one call: chunk, summarise in parallel, merge.
+            # The document takes one fair slot as a whole; its calls are
+            # bounded by map_reduce's own parallelism, so a queue timeout
+            # can't strike halfway and waste the chunks already done
+            async with self.scheduler.slot(user_id):
+                return await map_reduce(
+                    prompt,
+                    system_prompt,
+                    lambda system, part, tokens: self._generate_one(
+                        user_id, system, part, temperature, tokens, fair=False),
+                    max_tokens,
+                )
+        return await self._generate_one(
+            user_id, system_prompt, prompt, temperature, max_tokens, preset)
+
+    async def _generate_one(
+        self,
+        user_id: int,
+        system_prompt: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        preset: str | None = None,
+        fair: bool = True,
+    ) -> tuple[str, bool]:
+        """One upstream call (or cache hit); `fair=False` skips the per-user
+        slot, for calls made under a slot the caller already holds."""
+        key = ResponseCache.make_key(
+            self.llm.model, system_prompt, prompt, temperature, max_tokens)
+        use_cache = self.cache is not None and self.cache.cacheable(temperature)
+
+        if use_cache:
+            text = await self.cache.get(key)
+            if text is not None:
+                return text, True
+
+        # Exact miss: try a near-duplicate under the same prompt settings
+        threshold = self.semantic.threshold_for(preset) if use_cache and self.semantic else None
+        if threshold is not None:
+            namespace = SemanticCache.namespace(
+                self.llm.model, system_prompt, temperature, max_tokens)
+            # Embedding is CPU work that grows with the prompt: off the event loop
+            vector = await asyncio.to_thread(self.semantic.embed, prompt)
+            text = self.semantic.get(namespace, vector, threshold)
+            if text is not None:
+                return text, True
+
+        async def call_upstream():
+            # Wait for a fair share of the generation slots (the caller
+            # that starts the call waits in its own queue)
+            async with self.scheduler.slot(user_id) if fair else nullcontext():
+                text = await self.llm.complete(
+                    system_prompt=system_prompt,
+                    prompt=prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            if use_cache:
+                self.cache.set(key, text)
+            if threshold is not None:
+                self.semantic.set(namespace, vector, text)
+            return text
+
+        # Identical requests already in flight share that one upstream call
+        while True:
+            try:
+                return await self.flights.do(key, call_upstream), False
+            except RateLimited as e:
+                if e.user_id in (None, user_id):
+                    raise
+                # Joined another user's call that timed out in their queue;
+                # that 429 is theirs, so start (or join) a fresh call instead
+
+
+def generated_note(owner_id: int, prompt: str, text: str, system_prompt: str | None = None) -> models.Note:
+    return models.Note(
+        title=prompt[:50] if prompt else "Untitled",
+        content=text,
+        system_prompt=system_prompt,
+        prompt=prompt,
+        owner_id=owner_id,
+        is_bookmarked=False,
+    )
@@ -0,0 +1,117 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+from app.config import settings
+
+# Hashes made with other rounds are still accepted, and flagged for rehash
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+class HasherBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a small, dedicated process pool.
+
+    At most `max_pending` hash/verify jobs may be queued or running; any
+    more are rejected with HasherBusy instead of piling up, so a login
+    storm cannot take CPU or threadpool slots away from other endpoints.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.BCRYPT_WORKERS,
+        max_pending: int = settings.BCRYPT_MAX_PENDING,
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the server process has threads running
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusy("Too many sign-in attempts in progress, try again shortly")
+        executor = self.start()
+        self.pending += 1
+        try:
+            result = await asyncio.wrap_future(executor.submit(fn, *args))
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        ok, _ = await self._submit(_verify_and_update, password, hashed_password)
+        return ok
+
+    async def verify_and_update(
+        self,
+        password: str,
+        hashed_password: str,
+    ) -> tuple[bool, str | None]:
+        """Verify a password; also return a new hash if the stored one uses outdated parameters."""
+        ok, new_hash = await self._submit(_verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            self.rehashed += 1
+        return ok, new_hash
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,274 @@
+import asyncio
+import random
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import models
+from app.admission import RateLimited
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.generation import Generator, generated_note
+from app.llm import LLMOverloaded
+
+Job = models.GenerationJob
+
+PENDING = ("queued", "running")
+FINISHED = ("succeeded", "failed")
+
+# Worth another attempt later rather than failing the job outright
+TRANSIENT_ERRORS = (LLMOverloaded, RateLimited)
+
+
+def new_job_id() -> str:
+    return secrets.token_hex(16)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobRunner:
+    """Runs queued generation jobs from the generation_jobs table.
+
+    The table is the queue: a worker claims the oldest queued job with a
+    compare-and-set UPDATE, so several workers (or server processes) can
+    share it, and jobs outlive a restart. A job left "running" past its
+    lease by a worker that died is requeued, up to `max_attempts`. Jobs
+    that failed transiently are retried with exponential backoff.
+    """
+
+    def __init__(
+        self,
+        generator: Generator,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        workers: int = settings.JOB_WORKERS,
+        poll_interval: float = settings.JOB_POLL_SECONDS,
+        lease: float = settings.JOB_LEASE_SECONDS,
+        max_attempts: int = settings.JOB_MAX_ATTEMPTS,
+        retry_base: float = settings.JOB_RETRY_BASE_SECONDS,
+        retry_max: float = settings.JOB_RETRY_MAX_SECONDS,
+    ):
+        self.generator = generator
+        self.session_factory = session_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self._tasks: list[asyncio.Task] = []
+        self._wake = asyncio.Event()
+        # Jobs this process is running, requeued on shutdown
+        self._running: set[str] = set()
+        # job id -> event set when it finishes, for long-polling clients
+        self._done: dict[str, asyncio.Event] = {}
+
+        # Metrics
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+        self.requeued_stale = 0
+
+    def start(self):
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._reap(), name="job-reaper"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        if self._running:
+            # Hand our jobs back right away instead of waiting out the lease
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(Job)
+                    .where(Job.id.in_(self._running), Job.status == "running")
+                    .values(status="queued", started_at=None, attempts=Job.attempts - 1)
+                )
+                await db.commit()
+            self._running.clear()
+
+    def notify(self):
+        """Wake idle workers; call after queueing a job."""
+        self._wake.set()
+
+    async def wait(self, job_id: str, timeout: float):
+        """Wait up to `timeout` for a job run by this process to finish."""
+        event = self._done.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            # The job may be running in another process; caller re-checks the DB
+            if self._done.get(job_id) is event and not event.is_set():
+                del self._done[job_id]
+
+    async def _work(self):
+        while True:
+            self._wake.clear()
+            try:
+                job = await self._claim()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Job queue unavailable: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._running.add(job.id)
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Left running; the reaper requeues it once the lease expires
+                print(f"⚠️  Job {job.id} could not be saved: {e}")
+            self._running.discard(job.id)
+
+    async def _claim(self) -> models.GenerationJob | None:
+        async with self.session_factory() as db:
+            while True:
+                job_id = await db.scalar(
+                    select(Job.id)
+                    .where(Job.status == "queued")
+                    .where(or_(Job.run_after.is_(None), Job.run_after <= _now()))
+                    .order_by(Job.created_at, Job.id)
+                    .limit(1)
+                )
+                if job_id is None:
+                    return None
+
+                # Only one worker wins the queued -> running transition
+                claimed = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "queued")
+                    .values(status="running", started_at=_now(), attempts=Job.attempts + 1)
+                )
+                await db.commit()
+                if claimed.rowcount == 1:
+                    return await db.get(Job, job_id)
+
+    async def _run(self, job: models.GenerationJob):
+        try:
+            text, cached = await self.generator.generate(
+                user_id=job.owner_id,
+                system_prompt=job.system_prompt,
+                prompt=job.prompt,
+                temperature=job.temperature,
+                max_tokens=job.max_tokens,
+                preset=job.preset,
+            )
+        except asyncio.CancelledError:
+            raise
+        except TRANSIENT_ERRORS as e:
+            if job.attempts < self.max_attempts:
+                self.retried += 1
+                await self._retry_later(job, getattr(e, "retry_after", 0))
+                return
+            await self._fail(job.id, str(e))
+            return
+        except Exception as e:
+            await self._fail(job.id, f"Groq API Error: {e}")
+            return
+
+        async with self.session_factory() as db:
+            note = generated_note(job.owner_id, job.prompt, text, job.system_prompt)
+            db.add(note)
+            await db.flush()
+            await db.execute(
+                update(Job)
+                .where(Job.id == job.id)
+                .values(status="succeeded", note_id=note.id, cached=cached,
+                        error=None, finished_at=_now())
+            )
+            await db.commit()
+        self.succeeded += 1
+        self._finished(job.id)
+
+    async def _retry_later(self, job: models.GenerationJob, retry_after: float):
+        """Requeue a job, not to be claimed again until its backoff is over."""
+        delay = min(self.retry_max, self.retry_base * 2 ** (job.attempts - 1))
+        # Jittered, so jobs that failed together don't all retry together
+        delay = max(retry_after, delay * random.uniform(0.5, 1))
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job.id)
+                .values(status="queued", started_at=None,
+                        run_after=_now() + timedelta(seconds=delay))
+            )
+            await db.commit()
+        # No notify: the workers' polling picks it up once it's due
+
+    async def _fail(self, job_id: str, error: str):
+        self.failed += 1
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(status="failed", error=error, finished_at=_now())
+            )
+            await db.commit()
+        self._finished(job_id)
+
+    def _finished(self, job_id: str):
+        event = self._done.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(max(self.lease / 4, self.poll_interval))
+            try:
+                await self._requeue_stale()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Job reaper failed: {e}")
+
+    async def _requeue_stale(self):
+        cutoff = _now() - timedelta(seconds=self.lease)
+        stale = (Job.status == "running") & (Job.started_at < cutoff)
+        async with self.session_factory() as db:
+            failed = await db.execute(
+                update(Job)
+                .where(stale, Job.attempts >= self.max_attempts)
+                .values(status="failed", error="Job timed out", finished_at=_now())
+            )
+            requeued = await db.execute(
+                update(Job)
+                .where(stale)
+                .values(status="queued", started_at=None)
+            )
+            await db.commit()
+        self.failed += failed.rowcount
+        if requeued.rowcount:
+            self.requeued_stale += requeued.rowcount
+            print(f"♻️  Requeued {requeued.rowcount} stalled generation job(s)")
+            self.notify()
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers if self._tasks else 0,
+            "running": len(self._running),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+            "requeued_stale": self.requeued_stale,
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import random
+import time
+
+import httpx
+from openai import (
+    AsyncOpenAI,
+    APIConnectionError,
+    APITimeoutError,
+    APIStatusError,
+)
+
+from app.config import settings
+from app.metrics import LLM_TOKENS, LLM_UPSTREAM_SECONDS
+
+
+class LLMOverloaded(Exception):
+    """Raised when a request waited too long for a free upstream slot."""
+
+
+class LLMGateway:
+    """Shared async client for the upstream chat completions API.
+
+    One pooled HTTP client is reused by every request, at most
+    `max_concurrency` calls are in flight at once (the rest wait in a
+    queue), and 429/5xx/connection errors are retried with jittered
+    exponential backoff.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = settings.LLM_BASE_URL,
+        model: str = settings.LLM_MODEL,
+        timeout: float = settings.LLM_TIMEOUT_SECONDS,
+        max_concurrency: int = settings.LLM_MAX_CONCURRENCY,
+        queue_timeout: float = settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        max_retries: int = settings.LLM_MAX_RETRIES,
+    ):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        # Retries are handled here, with jitter, instead of inside the SDK
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=self._http,
+            max_retries=0,
+        )
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+        # Metrics
+        self.in_flight = 0
+        self.queued = 0
+        self.requests_total = 0
+        self.retries_total = 0
+        self.errors_total = 0
+        self.rejected_total = 0
+        self.queue_wait_seconds_total = 0.0
+        self.upstream_seconds_total = 0.0
+
+    async def complete(
+        self,
+        system_prompt: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> str:
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+
+        self.queued += 1
+        queued_at = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_total += 1
+            raise LLMOverloaded("Too many generations in progress, try again shortly")
+        finally:
+            self.queued -= 1
+        self.queue_wait_seconds_total += time.perf_counter() - queued_at
+
+        self.in_flight += 1
+        self.requests_total += 1
+        started_at = time.perf_counter()
+        outcome = "error"
+        try:
+            completion = await self._create_with_retries(
+                messages, temperature, max_tokens)
+            outcome = "ok"
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self.upstream_seconds_total += elapsed
+            LLM_UPSTREAM_SECONDS.observe(elapsed, self.model, outcome)
+            self.in_flight -= 1
+            self._slots.release()
+
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.inc(self.model, "prompt", amount=usage.prompt_tokens or 0)
+            LLM_TOKENS.inc(self.model, "completion", amount=usage.completion_tokens or 0)
+        return completion.choices[0].message.content
+
+    async def _create_with_retries(self, messages, temperature, max_tokens):
+        attempt = 0
+        while True:
+            try:
+                return await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            except (APIStatusError, APIConnectionError) as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt, e))
+                attempt += 1
+                self.retries_total += 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "requests_total": self.requests_total,
+            "retries_total": self.retries_total,
+            "errors_total": self.errors_total,
+            "rejected_total": self.rejected_total,
+            "queue_wait_seconds_total": round(self.queue_wait_seconds_total, 3),
+            "upstream_seconds_total": round(self.upstream_seconds_total, 3),
+        }
+
+    async def aclose(self):
+        await self.client.close()
+        await self._http.aclose()
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    return error.status_code == 429 or error.status_code >= 500
+
+
+def _backoff_delay(attempt: int, error: Exception) -> float:
+    # Honour the upstream's Retry-After on 429s when it sends one
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), 30.0)
+        except ValueError:
+            pass
+    # Full jitter: uniform in [0, 0.5 * 2^attempt], capped at 8s
+    return random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
@@ -0,0 +1,259 @@
+import bisect
+import threading
+import time
+from typing import Callable, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; wide enough for both fast API routes and long LLM generations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+            for key, value in items
+        ]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _number(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Holds metrics, plus collectors that read existing stats() at scrape time."""
+
+    def __init__(self):
+        self._metrics: list[Metric] = []
+        # prefix -> (stats, help, counter keys)
+        self._collectors: dict[str, tuple[Callable[[], dict], str, frozenset]] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_stats(self, prefix: str, stats: Callable[[], dict], help: str, counters: Iterable[str] = ()):
+        """Expose a component's stats() dict.
+
+        Keys in `counters` (running totals) and *_total keys become
+        counters, named with a _total suffix; the rest are gauges.
+        """
+        self._collectors[prefix] = (stats, help, frozenset(counters))
+
+    def remove_stats(self, prefix: str):
+        self._collectors.pop(prefix, None)
+
+    def _collect(self) -> Iterable[str]:
+        for prefix, (stats, help, counters) in list(self._collectors.items()):
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for key, value in values.items():
+                # Only plain numbers; nested dicts and labels are skipped
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                if key in counters:
+                    name, kind = f"{name}_total", "counter"
+                else:
+                    kind = "counter" if key.endswith("_total") else "gauge"
+                yield f"# HELP {name} {help}: {key.replace('_', ' ')}"
+                yield f"# TYPE {name} {kind}"
+                yield f"{name} {_number(value)}"
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        lines.extend(self._collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "neuronotes_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+))
+HTTP_IN_FLIGHT = registry.register(Gauge(
+    "neuronotes_http_requests_in_flight",
+    "HTTP requests currently being served",
+))
+LLM_UPSTREAM_SECONDS = registry.register(Histogram(
+    "neuronotes_llm_upstream_duration_seconds",
+    "Upstream chat completion latency, including retries",
+    ("model", "outcome"),
+))
+LLM_TOKENS = registry.register(Counter(
+    "neuronotes_llm_tokens_total",
+    "Tokens reported by the upstream API",
+    ("model", "kind"),
+))
+DB_QUERIES = registry.register(Counter(
+    "neuronotes_db_queries_total",
+    "SQL statements executed",
+    ("statement",),
+))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    "neuronotes_db_query_duration_seconds",
+    "SQL statement execution time",
+    ("statement",),
+    buckets=DB_BUCKETS,
+))
+
+HTTP_IN_FLIGHT.set(0)
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and counts those in flight.
+
+    Requests are labelled with the matched route template (/notes/{note_id}),
+    not the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started_at = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started_at,
+                scope["method"],
+                route.path if route is not None else "other",
+                str(status),
+            )
+
+
+def _statement_kind(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine: Engine):
+    """Count and time every statement run on `engine` (use .sync_engine for async engines)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started_at"].pop()
+        kind = _statement_kind(statement)
+        DB_QUERIES.inc(kind)
+        DB_QUERY_SECONDS.observe(time.perf_counter() - started, kind)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # Keep the start-time stack balanced when a statement fails
+        conn = context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
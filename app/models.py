@@ -1,8 +1,28 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index, Float
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
+import json
+
+from app.compression import CompressedJSON, CompressedText, SearchVector
 from app.database import Base
 
+# Length of the stored plain-text preview shown in note listings
+NOTE_PREVIEW_CHARS = 200
+
+
+def _note_preview(context):
+    return context.get_current_parameters()["content"][:NOTE_PREVIEW_CHARS]
+
+
+def _note_search_text(context):
+    params = context.get_current_parameters()
+    return (params.get("title") or "") + " " + params["content"]
+
+
+def _deck_search_text(context):
+    params = context.get_current_parameters()
+    return params["topic"] + " " + json.dumps(params["cards"], ensure_ascii=False)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -33,7 +53,16 @@ class Note(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     title = Column(String, nullable=True)
-    content = Column(Text, nullable=False)
+    # Compressed; listings read `preview` and search reads `search_vector`,
+    # both filled in from the plain text on insert
+    content = Column(CompressedText, nullable=False)
+    preview = Column(String(NOTE_PREVIEW_CHARS), nullable=True, default=_note_preview)
+    search_vector = Column(SearchVector, nullable=True, default=_note_search_text)
+
+    # What a generated note was generated from (the distillation dataset);
+    # deferred, since reading a note never needs them
+    system_prompt = deferred(Column(CompressedText, nullable=True))
+    prompt = deferred(Column(CompressedText, nullable=True))
 
     created_at = Column(
         DateTime(timezone=True),
@@ -50,6 +79,12 @@ class Note(Base):
 
     owner = relationship("User", back_populates="notes")
 
+    __table_args__ = (
+        # Serves the per-user, newest-first note listing
+        Index("ix_notes_owner_id_created_at", "owner_id", "created_at"),
+        Index("ix_notes_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
 class FlashcardDeck(Base):
     __tablename__ = "flashcard_decks"
 
@@ -57,7 +92,8 @@ class FlashcardDeck(Base):
     topic = Column(String, nullable=False)
     difficulty = Column(String, nullable=False)
     count = Column(Integer, nullable=False)
-    cards = Column(JSON, nullable=False)
+    cards = Column(CompressedJSON, nullable=False)
+    search_vector = Column(SearchVector, nullable=True, default=_deck_search_text)
     owner_id = Column(
         Integer,
         ForeignKey("users.id", ondelete="CASCADE"),
@@ -65,4 +101,50 @@ class FlashcardDeck(Base):
     )
     saved_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    owner = relationship("User", back_populates="flashcard_decks")
\ No newline at end of file
+    owner = relationship("User", back_populates="flashcard_decks")
+
+    __table_args__ = (
+        Index("ix_flashcard_decks_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    # Random hex id, so job ids can't be enumerated
+    id = Column(String(32), primary_key=True)
+    owner_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    # queued -> running -> succeeded | failed
+    status = Column(String(16), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    # A retried job isn't claimed before this (backoff)
+    run_after = Column(DateTime(timezone=True), nullable=True)
+
+    system_prompt = Column(Text, nullable=True)
+    prompt = Column(Text, nullable=False)
+    preset = Column(String, nullable=True)
+    temperature = Column(Float, nullable=False)
+    max_tokens = Column(Integer, nullable=False)
+
+    note_id = Column(
+        Integer,
+        ForeignKey("notes.id", ondelete="SET NULL"),
+        nullable=True
+    )
+    cached = Column(Boolean, nullable=False, default=False)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Workers claim the oldest queued job
+        Index("ix_generation_jobs_status_created_at", "status", "created_at"),
+        Index("ix_generation_jobs_owner_id", "owner_id"),
+    )
@@ -0,0 +1,183 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import models
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+# Pause before retrying a batch after the database failed
+RETRY_SECONDS = 1.0
+
+
+class NoteWriter:
+    """Write-behind persistence for generated notes.
+
+    `add` hands out the note's id straight away and queues the row; a
+    background task writes queued rows as one multi-row INSERT and one
+    COMMIT, once `batch_size` are waiting or `interval` seconds after the
+    first. Ids are reserved in blocks from the notes id sequence, so they
+    never clash with rows inserted elsewhere. Needs Postgres (SQLite has no
+    sequence to reserve from). The queue is per process, so it is only
+    used with a single worker.
+
+    Queued rows survive database errors and are retried; `stop` writes
+    whatever is left. Rows are lost only if the process dies first.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+        batch_size: int = settings.NOTE_WRITE_BATCH_SIZE,
+        interval: float = settings.NOTE_WRITE_INTERVAL_MS / 1000,
+        max_pending: int = settings.NOTE_WRITE_MAX_PENDING,
+        id_block: int = settings.NOTE_ID_BLOCK_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self.id_block = id_block
+
+        # note id -> row, in the order they were added
+        self._pending: dict[int, dict] = {}
+        self._ids: deque[int] = deque()
+        self._id_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._has_rows = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+        # Metrics
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.flush_seconds_total = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="note-writer")
+
+    async def stop(self):
+        """Stop the background task and write everything still queued."""
+        if self._task is not None:
+            # Not in the middle of a batch, so no committed rows get written twice
+            async with self._flush_lock:
+                self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        while self._pending:
+            before = len(self._pending)
+            await self.flush()
+            if len(self._pending) >= before:
+                print(f"❌ Could not write {before} queued note(s) on shutdown")
+                break
+
+    async def _next_id(self) -> int:
+        async with self._id_lock:
+            if not self._ids:
+                async with self.session_factory() as db:
+                    sequence = func.pg_get_serial_sequence("notes", "id")
+                    ids = await db.scalars(
+                        select(func.nextval(sequence))
+                        .select_from(func.generate_series(1, self.id_block))
+                    )
+                    self._ids.extend(ids)
+            return self._ids.popleft()
+
+    async def add(self, note: models.Note) -> int:
+        """Queue a new note and return the id it will be stored under."""
+        if len(self._pending) >= self.max_pending:
+            # The database is falling behind; make this caller wait for it
+            await self.flush()
+
+        note_id = await self._next_id()
+        self._pending[note_id] = {
+            "id": note_id,
+            "title": note.title,
+            "content": note.content,
+            "system_prompt": note.system_prompt,
+            "prompt": note.prompt,
+            "owner_id": note.owner_id,
+            "is_bookmarked": bool(note.is_bookmarked),
+            "created_at": datetime.now(timezone.utc),
+        }
+        self._has_rows.set()
+        if len(self._pending) >= self.batch_size:
+            self._full.set()
+        return note_id
+
+    def pending(self, note_id: int) -> dict | None:
+        """A queued row not written yet, so reads right after a generation find it."""
+        return self._pending.get(note_id)
+
+    async def flush_owner(self, owner_id: int):
+        """Write the queue now if it holds any of `owner_id`'s notes, so a
+        query or change made right after a generation sees them."""
+        if any(row["owner_id"] == owner_id for row in self._pending.values()):
+            await self.flush()
+
+    async def _run(self):
+        while True:
+            await self._has_rows.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️  Note writer failed, retrying: {e}")
+                await asyncio.sleep(RETRY_SECONDS)
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._pending:
+                rows = list(self._pending.values())[:self.batch_size]
+                start = time.perf_counter()
+                try:
+                    await self._insert(rows)
+                except IntegrityError:
+                    # e.g. the owner was deleted meanwhile; write the rest one by one
+                    await self._insert_each(rows)
+                except Exception:
+                    self.errors += 1
+                    raise
+                self.flush_seconds_total += time.perf_counter() - start
+                self.batches += 1
+                for row in rows:
+                    self._pending.pop(row["id"], None)
+
+            self._has_rows.clear()
+            self._full.clear()
+
+    async def _insert(self, rows: list[dict]):
+        async with self.session_factory() as db:
+            await db.execute(insert(models.Note), rows)
+            await db.commit()
+        self.written += len(rows)
+
+    async def _insert_each(self, rows: list[dict]):
+        for row in rows:
+            try:
+                await self._insert([row])
+            except IntegrityError as e:
+                self.dropped += 1
+                print(f"⚠️  Dropped generated note {row['id']}: {e.orig}")
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "reserved_ids": len(self._ids),
+            "written_total": self.written,
+            "batches_total": self.batches,
+            "dropped_total": self.dropped,
+            "errors_total": self.errors,
+            "flush_seconds_total": round(self.flush_seconds_total, 3),
+        }
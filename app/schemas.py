@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+from typing import Literal
 
 
 # User Schemas
@@ -45,3 +46,109 @@ class NoteResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# Bulk note operations (all-or-nothing, one transaction each)
+
+MAX_BULK_ITEMS = 500
+
+
+class NoteBulkCreate(BaseModel):
+    notes: list[NoteCreate] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class NoteBulkIds(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=MAX_BULK_ITEMS)
+
+
+class NoteBulkBookmark(NoteBulkIds):
+    # None toggles each note, like PATCH /notes/{id}/bookmark
+    bookmarked: bool | None = None
+
+
+class BulkItemResult(BaseModel):
+    id: int | None
+    status: str   # "created", "deleted", "updated" or "not_found"
+    is_bookmarked: bool | None = None
+
+
+class BulkResponse(BaseModel):
+    results: list[BulkItemResult]
+
+
+class NoteSummary(BaseModel):
+    id: int
+    title: str | None
+    created_at: datetime
+    is_bookmarked: bool
+    preview: str
+
+    class Config:
+        from_attributes = True
+
+
+class NotePage(BaseModel):
+    items: list[NoteSummary]
+    next_cursor: str | None
+
+
+# Search Schemas
+
+class SearchHit(BaseModel):
+    kind: str   # "note" or "deck"
+    id: int
+    title: str | None
+    created_at: datetime | None
+    rank: float
+    snippet: str | None
+
+
+class SearchPage(BaseModel):
+    items: list[SearchHit]
+    next_offset: int | None
+
+
+# Export / import (one JSON object per NDJSON line)
+
+class ExportedNote(BaseModel):
+    type: Literal["note"] = "note"
+    title: str | None = None
+    content: str
+    created_at: datetime | None = None
+    is_bookmarked: bool = False
+
+
+class ExportedDeck(BaseModel):
+    type: Literal["deck"] = "deck"
+    topic: str
+    difficulty: str
+    cards: list[dict]
+    saved_at: datetime | None = None
+
+
+class ImportResult(BaseModel):
+    notes: int
+    decks: int
+
+
+# Background generation jobs
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: str
+
+
+class JobStatus(BaseModel):
+    id: str
+    status: str   # "queued", "running", "succeeded" or "failed"
+    attempts: int
+    note_id: int | None
+    cached: bool
+    response: str | None = None   # the generated note, once succeeded
+    error: str | None
+    created_at: datetime | None
+    started_at: datetime | None
+    finished_at: datetime | None
+
+    class Config:
+        from_attributes = True
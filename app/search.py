@@ -0,0 +1,180 @@
+import json
+import re
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+# Highlight markers are markdown bold, which the frontend already renders
+SNIPPET_START = "**"
+SNIPPET_STOP = "**"
+
+# Bodies are stored compressed, so the queries only rank; snippets are cut
+# in Python from the decompressed text of the rows on the page
+POSTGRES_QUERIES = {
+    "note": """
+        SELECT 'note' AS kind, n.id, n.title, n.created_at,
+               ts_rank(n.search_vector, query) AS rank
+        FROM notes n, websearch_to_tsquery('english', :q) query
+        WHERE n.owner_id = :owner_id AND n.search_vector @@ query
+        ORDER BY rank DESC, n.id DESC
+        LIMIT :limit
+    """,
+    "deck": """
+        SELECT 'deck' AS kind, d.id, d.topic AS title, d.saved_at AS created_at,
+               ts_rank(d.search_vector, query) AS rank
+        FROM flashcard_decks d, websearch_to_tsquery('english', :q) query
+        WHERE d.owner_id = :owner_id AND d.search_vector @@ query
+        ORDER BY rank DESC, d.id DESC
+        LIMIT :limit
+    """,
+}
+
+# bm25() is lower-is-better, so it is negated to rank like ts_rank
+SQLITE_QUERIES = {
+    "note": """
+        SELECT 'note' AS kind, n.id, n.title, n.created_at,
+               -bm25(notes_fts) AS rank
+        FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid
+        WHERE notes_fts MATCH :q AND n.owner_id = :owner_id
+        ORDER BY rank DESC, n.id DESC
+        LIMIT :limit
+    """,
+    "deck": """
+        SELECT 'deck' AS kind, d.id, d.topic AS title, d.saved_at AS created_at,
+               -bm25(flashcard_decks_fts) AS rank
+        FROM flashcard_decks_fts JOIN flashcard_decks d ON d.id = flashcard_decks_fts.rowid
+        WHERE flashcard_decks_fts MATCH :q AND d.owner_id = :owner_id
+        ORDER BY rank DESC, d.id DESC
+        LIMIT :limit
+    """,
+}
+
+SNIPPET_WORDS = 20
+QUERY_TERM = re.compile(r"\w+")
+# websearch syntax words that aren't search terms
+QUERY_OPERATORS = {"or", "and", "not"}
+
+
+class SearchUnavailable(Exception):
+    """Raised when the database has no full-text index to search."""
+
+
+def _sqlite_match_query(q: str) -> str:
+    # Quote every term so user input is never parsed as FTS5 query syntax
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+async def search(
+    db: AsyncSession,
+    owner_id: int,
+    q: str,
+    kinds: list[str],
+    limit: int,
+    offset: int,
+) -> tuple[list[dict], bool]:
+    """Rank the user's notes and/or decks against `q`.
+
+    Returns one page of hits (best first) and whether more exist.
+    """
+    dialect = db.bind.dialect.name
+    # Each kind's top `window` hits are enough to fill this page after merging
+    window = offset + limit + 1
+
+    if dialect == "postgresql":
+        queries = POSTGRES_QUERIES
+        params = {"q": q}
+    elif dialect == "sqlite":
+        queries = SQLITE_QUERIES
+        params = {"q": _sqlite_match_query(q)}
+    else:
+        raise SearchUnavailable(f"Full-text search is not supported on {dialect}")
+
+    hits = []
+    for kind in kinds:
+        try:
+            rows = (await db.execute(
+                text(queries[kind]),
+                {**params, "owner_id": owner_id, "limit": window},
+            )).mappings().all()
+        except Exception as e:
+            if dialect == "sqlite" and "no such table" in str(e):
+                raise SearchUnavailable(
+                    "Search index missing, run 'alembic upgrade head'")
+            raise
+        hits.extend(dict(row) for row in rows)
+
+    hits.sort(key=lambda hit: (hit["rank"], hit["id"]), reverse=True)
+    page = hits[offset:offset + limit]
+    await _add_snippets(db, page, q)
+    return page, len(hits) > offset + limit
+
+
+async def _add_snippets(db: AsyncSession, hits: list[dict], q: str):
+    note_ids = [hit["id"] for hit in hits if hit["kind"] == "note"]
+    deck_ids = [hit["id"] for hit in hits if hit["kind"] == "deck"]
+    bodies = {}
+    if note_ids:
+        rows = await db.execute(
+            select(models.Note.id, models.Note.content)
+            .where(models.Note.id.in_(note_ids)))
+        bodies.update((("note", row.id), row.content) for row in rows)
+    if deck_ids:
+        rows = await db.execute(
+            select(models.FlashcardDeck.id, models.FlashcardDeck.cards)
+            .where(models.FlashcardDeck.id.in_(deck_ids)))
+        bodies.update(
+            (("deck", row.id), _cards_text(row.cards)) for row in rows)
+
+    terms = [t for t in QUERY_TERM.findall(q.lower()) if t not in QUERY_OPERATORS]
+    for hit in hits:
+        hit["snippet"] = make_snippet(bodies.get((hit["kind"], hit["id"]), ""), terms)
+
+
+def _cards_text(cards) -> str:
+    parts = []
+    for card in cards or []:
+        if isinstance(card, dict):
+            parts.extend(str(value) for value in card.values())
+        else:
+            parts.append(json.dumps(card, ensure_ascii=False))
+    return " · ".join(parts)
+
+
+def _term_match(word: str, terms: list[str]):
+    """The word's match object if it matches a query term, else None.
+
+    A prefix match stands in for the stemming the index does.
+    """
+    match = QUERY_TERM.search(word)
+    if match is None:
+        return None
+    token = match.group().lower()
+    if any(token.startswith(term[:max(4, len(term) - 2)]) for term in terms):
+        return match
+    return None
+
+
+def make_snippet(body: str, terms: list[str]) -> str | None:
+    """About SNIPPET_WORDS words around the first match, matches in bold."""
+    words = body.split()
+    if not words:
+        return None
+    first = next((i for i, word in enumerate(words) if _term_match(word, terms)), 0)
+    start = max(0, first - SNIPPET_WORDS // 4)
+
+    marked = []
+    for word in words[start:start + SNIPPET_WORDS]:
+        match = _term_match(word, terms)
+        if match:
+            word = (word[:match.start()] + SNIPPET_START + match.group()
+                    + SNIPPET_STOP + word[match.end():])
+        marked.append(word)
+
+    snippet = " ".join(marked)
+    if start > 0:
+        snippet = "…" + snippet
+    if start + SNIPPET_WORDS < len(words):
+        snippet += "…"
+    return snippet
@@ -0,0 +1,180 @@
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import xxhash
+
+from app.config import settings
+
+# Random-hyperplane LSH: each table hashes a vector to BITS sign bits, and
+# any entry sharing a bucket in any table is a candidate for exact scoring
+LSH_TABLES = 8
+LSH_BITS = 12
+
+WORD = re.compile(r"\w+")
+
+
+def normalise(text: str) -> str:
+    return " ".join(WORD.findall(text.lower()))
+
+
+def embed(text: str, dim: int) -> np.ndarray:
+    """Hashed bag of words, word bigrams and character trigrams, L2-normalised.
+
+    Whitespace, case and punctuation changes give the same vector; small
+    wording changes move it only slightly.
+    """
+    words = normalise(text).split()
+    features = words + [a + " " + b for a, b in zip(words, words[1:])]
+    joined = " ".join(words)
+    features += [joined[i:i + 3] for i in range(len(joined) - 2)]
+
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((xxhash.xxh32_intdigest(f) for f in features),
+                         dtype=np.uint32, count=len(features))
+    # Low bits pick the slot, the top bit the sign, so collisions cancel out
+    signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dim, signs)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def parse_thresholds(raw: str) -> dict[str, float]:
+    try:
+        thresholds = json.loads(raw or "{}")
+    except ValueError:
+        print("⚠️  SEMANTIC_CACHE_THRESHOLDS is not valid JSON, ignoring it")
+        return {}
+    return {str(preset): float(value) for preset, value in thresholds.items()}
+
+
+class SemanticCache:
+    """Near-duplicate lookup for generated responses.
+
+    Entries are grouped by namespace (model, system prompt and sampling
+    settings), so only requests that would be answered the same way can
+    match. Within a namespace prompts are embedded and indexed with LSH;
+    a hit needs cosine similarity of at least the preset's threshold.
+    Requests without a preset, and presets with a threshold of 1 or more,
+    are never matched.
+
+    Similarity is over the whole prompt, so a long input with a few real
+    edits (say 20 changed words in a 6 KB document) still scores about
+    0.97 and gets the old input's response; presets where that matters
+    need a higher threshold.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = settings.LLM_CACHE_TTL_SECONDS,
+        dim: int = settings.SEMANTIC_CACHE_DIM,
+        default_threshold: float = settings.SEMANTIC_CACHE_THRESHOLD,
+        thresholds: dict[str, float] | None = None,
+        seed: int = 0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.dim = dim
+        self.default_threshold = default_threshold
+        self.thresholds = (
+            parse_thresholds(settings.SEMANTIC_CACHE_THRESHOLDS)
+            if thresholds is None else thresholds
+        )
+
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((LSH_TABLES * LSH_BITS, dim)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(LSH_BITS)).astype(np.int64)
+
+        # entry id -> (namespace, vector, value, expires_at); insertion order is age
+        self._entries: OrderedDict[int, tuple[str, np.ndarray, str, float]] = OrderedDict()
+        # (namespace, table, bucket) -> entry ids
+        self._buckets: dict[tuple[str, int, int], set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.similarity_sum = 0.0
+
+    @staticmethod
+    def namespace(model: str, system_prompt: str, temperature: float, max_tokens: int) -> str:
+        raw = json.dumps([model, system_prompt, temperature, max_tokens], ensure_ascii=False)
+        return xxhash.xxh3_64_hexdigest(raw.encode("utf-8"))
+
+    def threshold_for(self, preset: str | None) -> float | None:
+        if not preset:
+            return None
+        threshold = self.thresholds.get(preset, self.default_threshold)
+        return threshold if threshold < 1 else None
+
+    def _bucket_keys(self, namespace: str, vector: np.ndarray) -> list[tuple[str, int, int]]:
+        bits = (self._planes @ vector > 0).reshape(LSH_TABLES, LSH_BITS)
+        buckets = bits.astype(np.int64) @ self._bit_weights
+        return [(namespace, table, int(bucket)) for table, bucket in enumerate(buckets)]
+
+    def embed(self, prompt: str) -> np.ndarray:
+        """The prompt's vector for `get` and `set`. Takes about 0.5 ms per KB
+        of prompt, so async callers run it in a thread."""
+        return embed(prompt, self.dim)
+
+    def get(self, namespace: str, vector: np.ndarray, threshold: float) -> str | None:
+        keys = self._bucket_keys(namespace, vector)
+        now = time.time()
+
+        with self._lock:
+            candidates = set()
+            for key in keys:
+                candidates |= self._buckets.get(key, set())
+
+            best_id, best_score = None, threshold
+            for entry_id in candidates:
+                _, other, _, expires_at = self._entries[entry_id]
+                if expires_at <= now:
+                    continue
+                score = float(vector @ other)
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.similarity_sum += best_score
+            return self._entries[best_id][2]
+
+    def set(self, namespace: str, vector: np.ndarray, value: str):
+        keys = self._bucket_keys(namespace, vector)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (namespace, vector, value, time.time() + self.ttl_seconds)
+            for key in keys:
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, (namespace, vector, _, _) = self._entries.popitem(last=False)
+        for key in self._bucket_keys(namespace, vector):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "mean_hit_similarity": round(self.similarity_sum / self.hits, 4) if self.hits else 0.0,
+        }
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+
+# Buckets idle long enough to have refilled are deleted every this many takes
+PRUNE_EVERY = 1000
+
+
+class SharedRateLimiter:
+    """Token buckets kept in a SQLite file, shared by every worker process.
+
+    With several workers each process would otherwise enforce its own
+    quota, multiplying a user's allowance by the worker count. Each take
+    is one short IMMEDIATE transaction, so concurrent workers serialise on
+    the bucket row. Wall-clock time is used, since monotonic clocks are
+    per process.
+
+    The SQLite calls run on a single worker thread, off the event loop. If
+    the file stays locked past `busy_timeout` (or can't be written at all)
+    the take fails open: the request is let through rather than stalled.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = settings.SHARED_STATE_BUSY_TIMEOUT_SECONDS):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets ("
+            " key TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="shared-state")
+        self._takes = 0
+
+        # Metrics
+        self.errors = 0
+
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        """Take one token; returns 0 on success, else seconds until one is free."""
+        try:
+            return await asyncio.wrap_future(self._executor.submit(self._take, key, capacity, rate))
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"⚠️  Shared quota unavailable, letting the request through: {e}")
+            return 0.0
+
+    async def give_back(self, key: str, capacity: float):
+        """Return a token taken for a request that never ran."""
+        try:
+            await asyncio.wrap_future(self._executor.submit(self._give_back, key, capacity))
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _take(self, key: str, capacity: float, rate: float) -> float:
+        with self._lock:
+            now = time.time()
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * rate)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+                if not wait:
+                    tokens -= 1
+                self._db.execute(
+                    "INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                    (key, tokens, now),
+                )
+                self._takes += 1
+                if self._takes % PRUNE_EVERY == 0:
+                    self._db.execute(
+                        "DELETE FROM rate_buckets WHERE updated < ?", (now - capacity / rate,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return wait
+
+    def _give_back(self, key: str, capacity: float):
+        with self._lock:
+            self._db.execute(
+                "UPDATE rate_buckets SET tokens = min(?, tokens + 1) WHERE key = ?", (capacity, key))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,45 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the call; everyone who arrives with
+    the same key while it is still running awaits that same result (or
+    exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            # Run the call as its own task so a disconnecting first caller
+            # does not cancel it for everyone else who joined
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved if every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,168 @@
+import gzip
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import xxhash
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse, Response
+
+try:
+    import brotli
+except ImportError:   # optional: without it only gzip is offered
+    brotli = None
+
+FRONTEND_DIR = Path(__file__).resolve().parent.parent
+INDEX = "index.html"
+# The only files served; everything else in the repo root stays private
+ASSETS = ("script.js", "styles.css")
+
+MEDIA_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+}
+
+# Fingerprinted names never change content, so they can be cached forever
+IMMUTABLE = "public, max-age=31536000, immutable"
+# The page and plain names must be revalidated to pick up new fingerprints
+REVALIDATE = "no-cache"
+
+# Preferred first when the client accepts several at the same q-value
+ENCODINGS = ("br", "gzip")
+
+
+@dataclass
+class Asset:
+    media_type: str
+    cache_control: str
+    digest: str
+    # encoding ("identity", "gzip", "br") -> body
+    bodies: dict[str, bytes]
+
+
+def _compress(body: bytes) -> dict[str, bytes]:
+    bodies = {"identity": body}
+    candidates = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        candidates["br"] = brotli.compress(body, quality=11)
+    for encoding, compressed in candidates.items():
+        # Tiny files can come out larger; just don't offer those
+        if len(compressed) < len(body):
+            bodies[encoding] = compressed
+    return bodies
+
+
+def _make_asset(name: str, body: bytes, cache_control: str) -> Asset:
+    return Asset(
+        media_type=MEDIA_TYPES[Path(name).suffix],
+        cache_control=cache_control,
+        digest=xxhash.xxh3_64_hexdigest(body),
+        bodies=_compress(body),
+    )
+
+
+def fingerprinted(name: str, digest: str) -> str:
+    stem, suffix = name.rsplit(".", 1)
+    return f"{stem}.{digest[:12]}.{suffix}"
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def negotiate(header: str | None, available) -> str:
+    """Picks the best encoding the client accepts; identity if none."""
+    if not header:
+        return "identity"
+    accepted = parse_accept_encoding(header)
+    best, best_q = "identity", 0.0
+    for encoding in ENCODINGS:
+        if encoding not in available:
+            continue
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class FrontendAssets:
+    """ASGI app serving the frontend from memory, precompressed.
+
+    At startup script.js and styles.css are fingerprinted with a content
+    hash, index.html is rewritten to reference the fingerprinted names,
+    and every file is gzip- and (if available) brotli-compressed once.
+    Requests then get the best encoding their Accept-Encoding allows;
+    fingerprinted names are cached as immutable, the page revalidates.
+    """
+
+    def __init__(self, directory: Path = FRONTEND_DIR):
+        self.files: dict[str, Asset] = {}
+
+        page = (directory / INDEX).read_text(encoding="utf-8")
+        for name in ASSETS:
+            body = (directory / name).read_bytes()
+            asset = _make_asset(name, body, IMMUTABLE)
+            versioned = fingerprinted(name, asset.digest)
+            self.files[versioned] = asset
+            # Old pages and bookmarks asking for the plain name still work
+            self.files[name] = _make_asset(name, body, REVALIDATE)
+            page = re.sub(
+                rf'((?:src|href)=")(?:\./|/)?{re.escape(name)}"',
+                rf'\g<1>{versioned}"',
+                page,
+            )
+
+        index = _make_asset(INDEX, page.encode("utf-8"), REVALIDATE)
+        self.files[INDEX] = index
+        self.files[""] = index
+
+    async def __call__(self, scope, receive, send):
+        assert scope["type"] == "http"
+        request_headers = Headers(scope=scope)
+        name = scope["path"].lstrip("/")
+        asset = self.files.get(name)
+
+        if scope["method"] not in ("GET", "HEAD"):
+            response = PlainTextResponse(
+                "Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+        elif asset is None:
+            response = PlainTextResponse("Not Found", status_code=404)
+        else:
+            encoding = negotiate(request_headers.get("accept-encoding"), asset.bodies)
+            etag = f'"{asset.digest}-{encoding}"'
+            headers = {
+                "Cache-Control": asset.cache_control,
+                "ETag": etag,
+                "Vary": "Accept-Encoding",
+            }
+            if encoding != "identity":
+                headers["Content-Encoding"] = encoding
+
+            if_none_match = request_headers.get("if-none-match", "")
+            if etag in [tag.strip() for tag in if_none_match.split(",")]:
+                response = Response(status_code=304, headers=headers)
+            else:
+                body = asset.bodies[encoding]
+                response = Response(
+                    b"" if scope["method"] == "HEAD" else body,
+                    media_type=asset.media_type,
+                    headers=headers,
+                )
+                if scope["method"] == "HEAD":
+                    response.headers["Content-Length"] = str(len(body))
+
+        await response(scope, receive, send)
@@ -0,0 +1,154 @@
+import asyncio
+import math
+import re
+from typing import Awaitable, Callable
+
+from app.config import settings
+
+# Neutral instructions for the intermediate passes; the user's own system
+# prompt (the preset) is only applied to the final pass
+MAP_SYSTEM_PROMPT = (
+    "You condense one part of a longer document. Keep every key fact, "
+    "definition, formula, name and date. Do not add anything new."
+)
+MAP_PROMPT = "Summarise part {index} of {total} of the document below.\n\n{chunk}"
+REDUCE_PROMPT = (
+    "Merge these summaries of consecutive parts of one document into a single "
+    "summary, in order, without repeating points.\n\n{parts}"
+)
+FINAL_PROMPT = (
+    "The document was too long to send at once, so here are summaries of its "
+    "consecutive sections, in order. Treat them as the document.\n\n{parts}"
+)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n\s*\n")
+
+# (system_prompt, prompt, max_tokens) -> (text, cached)
+Complete = Callable[[str, str, int], Awaitable[tuple[str, bool]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count: ~4 characters, or ~0.75 words, per token."""
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * 4 / 3))
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in SENTENCE_END.split(text) if s and s.strip()]
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int,
+    overlap_tokens: int = 0,
+    count: Callable[[str], int] = estimate_tokens,
+) -> list[str]:
+    """Pack whole sentences into chunks of at most `max_tokens`.
+
+    Each chunk starts with the last `overlap_tokens` worth of sentences of
+    the previous one, so a point spanning a boundary is seen in full by at
+    least one chunk. A single sentence longer than a chunk is split on words.
+    """
+    sentences = []
+    for sentence in split_sentences(text):
+        if count(sentence) <= max_tokens:
+            sentences.append(sentence)
+            continue
+        words, piece = sentence.split(), []
+        for word in words:
+            if piece and count(" ".join(piece + [word])) > max_tokens:
+                sentences.append(" ".join(piece))
+                piece = []
+            piece.append(word)
+        if piece:
+            sentences.append(" ".join(piece))
+
+    chunks, current, current_tokens = [], [], 0
+    for sentence in sentences:
+        tokens = count(sentence)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(current))
+            # Carry the tail of this chunk into the next one
+            carried, carried_tokens = [], 0
+            for previous in reversed(current):
+                previous_tokens = count(previous)
+                if carried_tokens + previous_tokens > overlap_tokens:
+                    break
+                carried.insert(0, previous)
+                carried_tokens += previous_tokens
+            if carried_tokens + tokens > max_tokens:
+                carried, carried_tokens = [], 0
+            current, current_tokens = carried, carried_tokens
+        current.append(sentence)
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def _format_parts(parts: list[str]) -> str:
+    return "\n\n".join(f"[Section {i}]\n{part}" for i, part in enumerate(parts, 1))
+
+
+async def map_reduce(
+    document: str,
+    system_prompt: str,
+    complete: Complete,
+    max_tokens: int,
+    chunk_tokens: int = settings.SUMMARY_CHUNK_TOKENS,
+    overlap_tokens: int = settings.SUMMARY_CHUNK_OVERLAP_TOKENS,
+    part_tokens: int = settings.SUMMARY_PART_MAX_TOKENS,
+    max_parallel: int = settings.SUMMARY_MAX_PARALLEL,
+) -> tuple[str, bool]:
+    """Run a generation over a document too long for one upstream call.
+
+    Map: the text is chunked and every chunk summarised, at most
+    `max_parallel` at a time. Reduce: neighbouring summaries are merged in
+    groups that fit one call, level by level, until all of them fit the
+    final call, which applies the user's system prompt.
+    Returns the result and whether every call was served from the cache.
+    """
+    slots = asyncio.Semaphore(max_parallel)
+    all_cached = True
+
+    async def call(system: str, prompt: str, tokens: int) -> str:
+        nonlocal all_cached
+        async with slots:
+            text, cached = await complete(system, prompt, tokens)
+        all_cached = all_cached and cached
+        return text
+
+    chunks = chunk_text(document, chunk_tokens, overlap_tokens)
+    parts = await asyncio.gather(*(
+        call(MAP_SYSTEM_PROMPT,
+             MAP_PROMPT.format(index=i + 1, total=len(chunks), chunk=chunk),
+             part_tokens)
+        for i, chunk in enumerate(chunks)
+    ))
+
+    while len(parts) > 1 and estimate_tokens(_format_parts(parts)) > chunk_tokens:
+        groups, group, group_tokens = [], [], 0
+        for part in parts:
+            tokens = estimate_tokens(part)
+            if group and group_tokens + tokens > chunk_tokens:
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(part)
+            group_tokens += tokens
+        groups.append(group)
+        if len(groups) == len(parts):
+            # Every summary fills a call on its own; merge pairwise to make progress
+            groups = [parts[i:i + 2] for i in range(0, len(parts), 2)]
+
+        parts = await asyncio.gather(*(
+            call(MAP_SYSTEM_PROMPT,
+                 REDUCE_PROMPT.format(parts=_format_parts(group)),
+                 part_tokens)
+            for group in groups
+        ))
+
+    final = await call(
+        system_prompt,
+        FINAL_PROMPT.format(parts=_format_parts(parts)),
+        max_tokens,
+    )
+    return final, all_cached
@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import httpx
+
+# Share of each action in the traffic mix
+MIX = {
+    "list_notes": 35,
+    "get_note": 15,
+    "generate": 15,
+    "list_decks": 10,
+    "get_deck": 10,
+    "save_deck": 5,
+    "me": 5,
+    "login": 5,
+}
+
+PROMPTS = [
+    "Summarise photosynthesis for a year 9 class",
+    "Explain the water cycle in five bullet points",
+    "What causes the seasons on Earth?",
+    "Give three examples of Newton's third law",
+    "Explain mitosis versus meiosis",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until_up(url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def percentile(sorted_values, p):
+    """ nearest-rank percentile of an already sorted list """
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[k]
+
+
+class VirtualUser:
+    """ one student: logs in once, then loops over actions from the mix """
+
+    def __init__(self, client, email, password, results, rng):
+        self.client = client
+        self.email = email
+        self.password = password
+        self.results = results
+        self.rng = rng
+        self.headers = {}
+        self.note_ids = []
+        self.deck_ids = []
+
+    async def timed(self, name, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, "error"
+        self.results[name].append((time.perf_counter() - start, status))
+        return response
+
+    async def login(self):
+        r = await self.timed("login", "POST", "/login",
+                             data={"username": self.email, "password": self.password})
+        if r is not None and r.status_code == 200:
+            self.headers = {"Authorization": "Bearer " + r.json()["access_token"]}
+
+    async def setup(self):
+        await self.client.post("/register", json={"email": self.email, "password": self.password})
+        await self.login()
+        notes = [{"title": f"Seed {i}", "content": " ".join(PROMPTS) * 10} for i in range(20)]
+        r = await self.client.post("/notes/bulk", json={"notes": notes}, headers=self.headers)
+        self.note_ids = [item["id"] for item in r.json()["results"]]
+        await self.save_deck()
+
+    async def save_deck(self):
+        cards = [{"question": f"Q{i}?", "answer": f"A{i}"} for i in range(20)]
+        r = await self.timed("save_deck", "POST", "/flashcards", headers=self.headers,
+                             json={"topic": "Biology", "difficulty": "medium", "cards": cards})
+        if r is not None and r.status_code == 200:
+            self.deck_ids.append(r.json()["id"])
+
+    async def step(self, action):
+        if action == "login":
+            await self.login()
+        elif action == "me":
+            await self.timed("me", "GET", "/me", headers=self.headers)
+        elif action == "list_notes":
+            await self.timed("list_notes", "GET", "/notes", params={"limit": 50}, headers=self.headers)
+        elif action == "get_note":
+            note_id = self.rng.choice(self.note_ids)
+            await self.timed("get_note", "GET", f"/notes/{note_id}", headers=self.headers)
+        elif action == "generate":
+            r = await self.timed("generate", "POST", "/generate", headers=self.headers, json={
+                "prompt": self.rng.choice(PROMPTS),
+                "temperature": 0 if self.rng.random() < 0.5 else 0.7,
+                "max_tokens": 400,
+            })
+            if r is not None and r.status_code == 200:
+                self.note_ids.append(r.json()["note_id"])
+        elif action == "list_decks":
+            await self.timed("list_decks", "GET", "/flashcards", headers=self.headers)
+        elif action == "get_deck":
+            deck_id = self.rng.choice(self.deck_ids)
+            await self.timed("get_deck", "GET", f"/flashcards/{deck_id}", headers=self.headers)
+        elif action == "save_deck":
+            await self.save_deck()
+
+    async def run(self, deadline, think_time):
+        actions, weights = zip(*MIX.items())
+        while time.monotonic() < deadline:
+            await self.step(self.rng.choices(actions, weights)[0])
+            if think_time:
+                await asyncio.sleep(self.rng.expovariate(1 / think_time))
+
+
+async def drive(base_url, args):
+    results = defaultdict(list)
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        users = [
+            VirtualUser(client, f"load{i}@example.com", "loadtest-pw", results, random.Random(i))
+            for i in range(args.users)
+        ]
+        print(f"👥 Setting up {len(users)} users...")
+        await asyncio.gather(*(u.setup() for u in users))
+        results.clear()
+
+        print(f"🏃 Running mixed traffic for {args.duration}s...")
+        started = time.monotonic()
+        await asyncio.gather(*(u.run(started + args.duration, args.think_time) for u in users))
+        elapsed = time.monotonic() - started
+
+        metrics = (await client.get("/metrics")).text
+    return results, elapsed, metrics
+
+
+def report(results, elapsed):
+    rows = {}
+    print(f"\n{'endpoint':<12} {'count':>7} {'rps':>8} {'errors':>7} {'429s':>6} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    total = 0
+    for name in MIX:
+        samples = results.get(name, [])
+        if not samples:
+            continue
+        latencies = sorted(s[0] * 1000 for s in samples)
+        errors = sum(1 for _, status in samples if status == "error" or status >= 400)
+        throttled = sum(1 for _, status in samples if status == 429)
+        row = {
+            "count": len(samples),
+            "rps": len(samples) / elapsed,
+            "errors": errors,
+            "throttled": throttled,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": latencies[-1],
+        }
+        rows[name] = row
+        total += len(samples)
+        print(f"{name:<12} {row['count']:>7} {row['rps']:>8.1f} {errors:>7} {throttled:>6} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    print(f"\nTotal: {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against SQLite and a local fake LLM")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--think-time", type=float, default=0.1, help="mean pause between a user's requests (s)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--llm-jitter", type=float, default=0.2)
+    parser.add_argument("--llm-tokens-per-second", type=int, default=200)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=0,
+                        help="serve with serve.py and this many pre-forked workers (0: one uvicorn process)")
+    parser.add_argument("--json", help="also write the per-endpoint results to this file")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra app settings, e.g. --env LLM_CACHE_ENABLED=false")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="neuronotes-load-")
+    llm_port, app_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        "ASYNC_DATABASE_URL": "",
+        "SECRET_KEY": "load-test-secret",
+        "ALGORITHM": "HS256",
+        "GROQ_API_KEY": "fake-key",
+        "LLM_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "LLM_CACHE_PATH": "",
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        # The harness itself is one client address hammering the API
+        "GEN_RATE_PER_MINUTE": "100000",
+        "GEN_BURST": "100000",
+    }
+    if args.workers:
+        # serve.py puts the shared cache and quota files in its state dir
+        del env["LLM_CACHE_PATH"]
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    processes = []
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, "fake_llm.py", "--port", str(llm_port),
+            "--latency", str(args.llm_latency), "--jitter", str(args.llm_jitter),
+            "--tokens-per-second", str(args.llm_tokens_per_second),
+            "--rate-429", str(args.llm_429_rate),
+        ]))
+        subprocess.run([
+            sys.executable, "-c",
+            "from app.database import Base, engine; from app import models; Base.metadata.create_all(engine)",
+        ], env=env, check=True)
+        if args.workers:
+            server = [sys.executable, "serve.py", "--port", str(app_port),
+                      "--workers", str(args.workers), "--state-dir", workdir]
+        else:
+            server = [sys.executable, "-m", "uvicorn", "main:app",
+                      "--host", "127.0.0.1", "--port", str(app_port), "--log-level", "warning"]
+        processes.append(subprocess.Popen(server, env=env))
+
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_until_up(f"http://127.0.0.1:{llm_port}/stats")
+        wait_until_up(f"{base_url}/metrics")
+
+        results, elapsed, metrics = asyncio.run(drive(base_url, args))
+        rows = report(results, elapsed)
+
+        llm_stats = httpx.get(f"http://127.0.0.1:{llm_port}/stats").json()
+        print(f"Fake LLM: {llm_stats['requests']} calls, {llm_stats['rejected']} answered with 429")
+        for line in metrics.splitlines():
+            if line.startswith(("neuronotes_llm_cache_hit_rate", "neuronotes_db_queries_total")):
+                print(line)
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"elapsed": elapsed, "users": args.users, "endpoints": rows}, f, indent=2)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
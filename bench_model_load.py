@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import torch
+import sentencepiece as spm
+from model import EduLLM, load_model
+
+# --- CONFIGURATION ---
+model_path = os.path.join("data", "edullm_model.pt")
+tokenizer_path = os.path.join("data", "tokenizer.model")
+runs = 5
+
+
+def read_rss():
+    """ resident memory of this process in MB, split into private (anon) and page-cache (file) pages """
+    rss = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS", "RssAnon", "RssFile")):
+                key, value = line.split(":")
+                rss[key] = int(value.split()[0]) / 1024
+    return rss
+
+
+def load_once(mode, path, vocab_size):
+    """ load the model one way in a fresh interpreter and report time + memory """
+    start = time.perf_counter()
+    if mode == "eager":
+        # the old path: random init, full read + unpickle, then a second copy
+        model = EduLLM(vocab_size)
+        checkpoint = torch.load(path, map_location=torch.device('cpu'))
+        model.load_state_dict(checkpoint)
+        model.eval()
+    else:
+        model = load_model(path, vocab_size)
+    elapsed = time.perf_counter() - start
+
+    # touch every weight once, as the first generation would
+    with torch.no_grad():
+        model(torch.zeros((1, 8), dtype=torch.long))
+    rss = read_rss()
+    print(f"{elapsed:.4f} {rss['VmRSS']:.1f} {rss['RssAnon']:.1f} {rss['RssFile']:.1f}")
+
+
+def main():
+    sp = spm.SentencePieceProcessor()
+    sp.load(tokenizer_path)
+    vocab_size = sp.get_piece_size()
+
+    path = model_path
+    if not os.path.exists(path):
+        # no trained weights around: benchmark against a randomly initialised checkpoint of the same shape
+        path = os.path.join(tempfile.mkdtemp(), "edullm_model.pt")
+        torch.save(EduLLM(vocab_size).state_dict(), path)
+        print(f"⚠️  {model_path} not found, using a random checkpoint at {path}")
+
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"📦 Checkpoint: {size_mb:.1f} MB, vocab {vocab_size}, {runs} cold starts per mode\n")
+
+    baseline = None
+    for mode in ["eager", "mmap"]:
+        samples = []
+        for _ in range(runs):
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode, path, str(vocab_size)],
+                capture_output=True, text=True, check=True,
+            )
+            samples.append([float(v) for v in out.stdout.split()])
+        load_s, rss, anon, file_rss = [sorted(col)[len(col) // 2] for col in zip(*samples)]
+        if baseline is None:
+            baseline = (load_s, anon)
+        print(f"{mode:>6}: load {load_s * 1000:7.1f} ms | RSS {rss:6.1f} MB "
+              f"(private {anon:6.1f} MB, shared page cache {file_rss:6.1f} MB)")
+
+    print(f"\n⚡ Load speedup: {baseline[0] / load_s:.1f}x, "
+          f"private memory per worker: {baseline[1]:.1f} MB -> {anon:.1f} MB")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        torch.set_num_threads(1)
+        load_once(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,73 @@
+import gzip
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import schemas
+
+# --- CONFIGURATION ---
+sizes = (1_000, 10_000)
+runs = 5
+content = "Photosynthesis converts light energy into chemical energy. " * 20
+
+
+def make_notes(n):
+    """ ORM-like rows, as the routes get them back from SQLAlchemy """
+    now = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            id=i,
+            title=f"Note {i}",
+            content=content,
+            created_at=now - timedelta(minutes=i),
+            is_bookmarked=i % 7 == 0,
+        )
+        for i in range(n)
+    ]
+
+
+def best_of(fn):
+    """ best wall time of a few runs, in ms """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def main():
+    adapter = TypeAdapter(list[schemas.NoteResponse])
+
+    for n in sizes:
+        notes = make_notes(n)
+
+        # What FastAPI does for a response_model: validate, then dump to JSON-able python
+        def validate_and_dump():
+            return adapter.dump_python(adapter.validate_python(notes, from_attributes=True), mode="json")
+
+        t_model, payload = best_of(validate_and_dump)
+        # JSONResponse.render
+        t_json, body = best_of(lambda: json.dumps(
+            payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8"))
+        # ORJSONResponse.render
+        t_orjson, _ = best_of(lambda: orjson.dumps(payload))
+        # the old jsonable_encoder pass, for routes without a response_model
+        t_encoder, _ = best_of(lambda: jsonable_encoder(payload))
+        t_gzip, compressed = best_of(lambda: gzip.compress(body, compresslevel=5))
+
+        print(f"--- {n} notes ({len(body) / 1024:.0f} KB, gzip level 5: {len(compressed) / 1024:.0f} KB) ---")
+        print(f"validate + dump (from_attributes): {t_model:8.1f} ms")
+        print(f"jsonable_encoder:                  {t_encoder:8.1f} ms")
+        print(f"json.dumps:                        {t_json:8.1f} ms")
+        print(f"orjson.dumps:                      {t_orjson:8.1f} ms ({t_json / t_orjson:.1f}x)")
+        print(f"gzip:                              {t_gzip:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
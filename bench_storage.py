@@ -0,0 +1,98 @@
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+# app.database builds its engines on import; the benchmark makes its own
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import models
+from app.compression import compress_text, decompress_text
+from app.config import settings
+from app.database import Base
+
+# --- CONFIGURATION ---
+codecs = ("none", "zlib", "zstd")
+n_notes = 5_000
+runs = 3
+
+VOCABULARY = (
+    "photosynthesis chlorophyll glucose energy light cell membrane nucleus mitochondria "
+    "respiration enzyme protein oxygen carbon dioxide water plant animal organism "
+    "structure function process reaction molecule atom electron diffusion osmosis"
+).split()
+
+
+def make_note(rng):
+    """ a generated study note: markdown headings, bullets and prose, ~3-6 KB """
+    parts = []
+    for section in range(rng.randint(3, 6)):
+        parts.append(f"## {rng.choice(VOCABULARY).title()} and {rng.choice(VOCABULARY)}")
+        for _ in range(rng.randint(4, 8)):
+            sentence = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 18)))
+            parts.append(f"- **{rng.choice(VOCABULARY)}**: {sentence.capitalize()}.")
+        parts.append(" ".join(rng.choice(VOCABULARY) for _ in range(60)).capitalize() + ".")
+    return "\n".join(parts)
+
+
+def best_of(fn):
+    """ best wall time of a few runs, in ms """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings), result
+
+
+def run(codec, notes, workdir):
+    settings.STORAGE_COMPRESSION = codec
+    path = os.path.join(workdir, f"{codec}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(models.User(id=1, email="bench@example.com", hashed_password="x"))
+        db.commit()
+
+    start = time.perf_counter()
+    with Session(engine) as db:
+        db.add_all(models.Note(title=f"Note {i}", content=content, owner_id=1)
+                   for i, content in enumerate(notes))
+        db.commit()
+    t_write = (time.perf_counter() - start) * 1000
+
+    def read_all():
+        with Session(engine) as db:
+            return db.scalars(select(models.Note.content)).all()
+
+    t_read, contents = best_of(read_all)
+    assert contents == notes
+    engine.dispose()
+    return os.path.getsize(path), t_write, t_read
+
+
+def main():
+    rng = random.Random(0)
+    notes = [make_note(rng) for _ in range(n_notes)]
+    raw_bytes = sum(len(n.encode("utf-8")) for n in notes)
+    print(f"{n_notes} notes, {raw_bytes / 2**20:.1f} MB of text (min {settings.STORAGE_COMPRESS_MIN_BYTES} bytes to compress)")
+
+    print(f"\n{'codec':<6} {'ratio':>6} {'compress':>10} {'decompress':>11} "
+          f"{'db size':>9} {'write':>9} {'read':>9}")
+    with tempfile.TemporaryDirectory(prefix="neuronotes-storage-") as workdir:
+        for codec in codecs:
+            settings.STORAGE_COMPRESSION = codec
+            t_compress, packed = best_of(lambda: [compress_text(n) for n in notes])
+            t_decompress, _ = best_of(lambda: [decompress_text(p) for p in packed])
+            ratio = raw_bytes / sum(len(p) for p in packed)
+
+            size, t_write, t_read = run(codec, notes, workdir)
+            print(f"{codec:<6} {ratio:>5.2f}x {t_compress:>8.1f}ms {t_decompress:>9.1f}ms "
+                  f"{size / 2**20:>7.1f}MB {t_write:>7.0f}ms {t_read:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
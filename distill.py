@@ -0,0 +1,203 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+
+import torch
+
+from model import load_model
+from train import (
+    block_size, dropout, estimate_loss, load_tokenizer, n_embd, n_head, n_layer, train,
+)
+
+# --- CONFIGURATION (overridden by the command line) ---
+MODEL_PATH = os.path.join("data", "edullm_model.pt")
+DISTILLED_PATH = os.path.join("data", "edullm_distilled.pt")
+PAIRS_PATH = os.path.join("data", "distill_pairs.jsonl")
+# System prompts (presets) with fewer teacher outputs than this are left out
+MIN_PRESET_PAIRS = 50
+# Share of prompts held out for evaluation, chosen by hash so it never changes
+VAL_PERCENT = 10
+# Same story separator as prepare_tinystories.py
+END_OF_TEXT = "<|endoftext|>"
+SEED = 1337
+
+
+def _digest(*parts):
+    return hashlib.sha1("\x00".join(p or "" for p in parts).encode("utf-8")).hexdigest()
+
+
+def format_prompt(system_prompt, prompt):
+    """ what the student sees before it writes the teacher's answer """
+    instruction = f"Instruction: {system_prompt}\n" if system_prompt else ""
+    return f"{instruction}Input: {prompt}\nResponse: "
+
+
+# --- 1. EXPORT ---
+def export(args):
+    """ stream the notes table into prompt/response pairs, one JSON line each """
+    from sqlalchemy import select
+    from app import models
+    from app.database import engine
+
+    query = (
+        select(models.Note.system_prompt, models.Note.prompt, models.Note.content)
+        .where(models.Note.prompt.is_not(None))
+        .order_by(models.Note.id)
+        .execution_options(yield_per=1000)
+    )
+
+    # first pass: how many teacher outputs each preset has
+    presets = Counter()
+    with engine.connect() as conn:
+        for row in conn.execute(query):
+            presets[_digest(row.system_prompt)] += 1
+    common = {key for key, count in presets.items() if count >= args.min_pairs}
+
+    # second pass: write the pairs of the common presets, skipping repeats
+    # (cached responses are saved as a new note every time)
+    seen = set()
+    written = Counter()
+    with engine.connect() as conn, open(args.pairs, "w", encoding="utf-8") as f:
+        for row in conn.execute(query):
+            if _digest(row.system_prompt) not in common:
+                continue
+            key = _digest(row.system_prompt, row.prompt)
+            if key in seen:
+                continue
+            seen.add(key)
+            split = "val" if int(key, 16) % 100 < VAL_PERCENT else "train"
+            f.write(json.dumps({
+                "system_prompt": row.system_prompt,
+                "prompt": row.prompt,
+                "response": row.content,
+                "split": split,
+            }, ensure_ascii=False) + "\n")
+            written[split] += 1
+
+    print(f"📤 {written['train']} train / {written['val']} val pairs from {len(common)} "
+          f"of {len(presets)} system prompts (>= {args.min_pairs} outputs each) -> {args.pairs}")
+
+
+def load_pairs(path):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No pairs at {path}. Run `python distill.py export` first!")
+    with open(path, encoding="utf-8") as f:
+        pairs = [json.loads(line) for line in f]
+    return [p for p in pairs if p["split"] == "train"], [p for p in pairs if p["split"] == "val"]
+
+
+def encode(sp, pairs):
+    """ one token stream of prompt + response + separator, as train.py expects """
+    ids = []
+    for pair in pairs:
+        text = format_prompt(pair["system_prompt"], pair["prompt"]) + pair["response"]
+        ids.extend(sp.encode_as_ids(f"{text}\n{END_OF_TEXT}\n"))
+    return torch.tensor(ids, dtype=torch.long)
+
+
+# --- 2. FINE-TUNE ---
+def finetune(args):
+    torch.manual_seed(SEED)
+    sp = load_tokenizer()
+    train_pairs, val_pairs = load_pairs(args.pairs)
+    train_data, val_data = encode(sp, train_pairs), encode(sp, val_pairs)
+    if min(len(train_data), len(val_data)) <= block_size:
+        raise ValueError(f"Need more than {block_size} tokens in each split, "
+                         f"got {len(train_data)} train / {len(val_data)} val")
+    print(f"✅ {len(train_pairs)} train pairs ({len(train_data)} tokens), "
+          f"{len(val_pairs)} val pairs ({len(val_data)} tokens)")
+
+    # the base may be a pruned checkpoint; load_model reads its shapes
+    model = load_model(args.model, sp.get_piece_size(), n_embd, n_head, n_layer, block_size, dropout, mmap=False)
+    print(f"🔥 Distilling into {args.model} for {args.iters} steps...")
+    train(model, train_data, val_data, args.iters, save_path=args.out,
+          learning_rate=args.learning_rate, eval_interval=max(1, args.iters // 5),
+          eval_iters=args.eval_iters, batch_size=args.batch_size)
+    torch.save(model.state_dict(), args.out)
+    print(f"💾 Saved to {args.out}")
+
+
+# --- 3. EVALUATE ---
+def rouge_l(candidate, reference):
+    """ ROUGE-L F1 over words: longest common subsequence vs both lengths """
+    a, b = candidate.split(), reference.split()
+    if not a or not b:
+        return 0.0
+    row = [0] * (len(b) + 1)
+    for word in a:
+        previous = 0
+        for j, other in enumerate(b, 1):
+            previous, row[j] = row[j], previous + 1 if word == other else max(row[j], row[j - 1])
+    lcs = row[-1]
+    if lcs == 0:
+        return 0.0
+    precision, recall = lcs / len(a), lcs / len(b)
+    return 2 * precision * recall / (precision + recall)
+
+
+@torch.no_grad()
+def answer(model, sp, pair, max_new_tokens):
+    """ the model's response to one held-out prompt, and how long it took """
+    prompt = format_prompt(pair["system_prompt"], pair["prompt"])
+    idx = torch.tensor([sp.encode_as_ids(prompt)[-(block_size - 1):]], dtype=torch.long)
+    start = time.perf_counter()
+    out = model.generate(idx, max_new_tokens=max_new_tokens)
+    elapsed = time.perf_counter() - start
+    text = sp.decode_ids(out[0, idx.shape[1]:].tolist())
+    return text.split(END_OF_TEXT)[0].strip(), elapsed
+
+
+def evaluate(args):
+    sp = load_tokenizer()
+    _, val_pairs = load_pairs(args.pairs)
+    val_data = encode(sp, val_pairs)
+    samples = val_pairs[:max(0, args.samples)]
+    if not samples:
+        raise ValueError(f"Nothing to answer: {len(val_pairs)} val pairs, --samples {args.samples}")
+    if len(val_data) <= block_size:
+        raise ValueError(f"Need more than {block_size} val tokens, got {len(val_data)}")
+    print(f"📊 {len(samples)} held-out prompts, up to {args.max_new_tokens} new tokens each\n")
+    print(f"{'model':<10} {'val loss':>9} {'ROUGE-L':>8} {'latency':>10} {'tokens/s':>9}")
+
+    for name, path in (("base", args.model), ("distilled", args.out)):
+        model = load_model(path, sp.get_piece_size(), n_embd, n_head, n_layer, block_size, dropout)
+        torch.manual_seed(SEED)
+        val_loss = estimate_loss(model, {"val": val_data}, args.eval_iters, args.batch_size)["val"].item()
+
+        torch.manual_seed(SEED)
+        scores, seconds = [], 0.0
+        for pair in samples:
+            text, elapsed = answer(model, sp, pair, args.max_new_tokens)
+            scores.append(rouge_l(text, pair["response"]))
+            seconds += elapsed
+        latency = seconds / len(samples)
+        print(f"{name:<10} {val_loss:>9.4f} {sum(scores) / len(scores):>8.3f} "
+              f"{latency * 1000:>8.0f}ms {args.max_new_tokens / latency:>9.1f}")
+
+    print("\nROUGE-L is against the teacher's saved output; latency is local CPU "
+          "generation, with no network round trip")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the saved LLM outputs (notes) into EduLLM")
+    parser.add_argument("step", choices=["export", "train", "eval"])
+    parser.add_argument("--pairs", default=PAIRS_PATH)
+    parser.add_argument("--model", default=MODEL_PATH, help="the student to start from")
+    parser.add_argument("--out", default=DISTILLED_PATH)
+    parser.add_argument("--min-pairs", type=int, default=MIN_PRESET_PAIRS, help="outputs a system prompt needs to be included")
+    parser.add_argument("--iters", type=int, default=2000)
+    parser.add_argument("--learning-rate", type=float, default=1e-4)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--eval-iters", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=20, help="held-out prompts answered in eval")
+    parser.add_argument("--max-new-tokens", type=int, default=100)
+    args = parser.parse_args()
+
+    {"export": export, "train": finetune, "eval": evaluate}[args.step](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# --- CONFIGURATION (overridden by the command line) ---
+config = {
+    "latency": 0.5,            # seconds before the first token
+    "jitter": 0.2,             # +/- uniform jitter on latency
+    "tokens_per_second": 200,  # decode speed after the first token
+    "completion_tokens": 150,  # tokens per reply (capped by max_tokens)
+    "rate_429": 0.0,           # fraction of requests rejected with 429
+    "retry_after": 1,          # Retry-After sent with 429s
+}
+counters = {"requests": 0, "rejected": 0, "streamed": 0}
+
+app = FastAPI()
+
+WORDS = ("cells", "energy", "photosynthesis", "the", "of", "light", "is", "and",
+         "chlorophyll", "glucose", "plants", "water", "carbon", "dioxide", "oxygen")
+
+
+def fake_reply(prompt: str, n_tokens: int) -> list[str]:
+    """ deterministic per prompt, so the app's response cache behaves as with a real model at temperature 0 """
+    rng = random.Random(prompt)
+    return [rng.choice(WORDS) for _ in range(n_tokens)]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    counters["requests"] += 1
+
+    if random.random() < config["rate_429"]:
+        counters["rejected"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+            headers={"Retry-After": str(config["retry_after"])},
+        )
+
+    prompt = body["messages"][-1]["content"]
+    n_tokens = min(config["completion_tokens"], body.get("max_tokens") or config["completion_tokens"])
+    tokens = fake_reply(prompt, n_tokens)
+    prompt_tokens = sum(len(m["content"].split()) for m in body["messages"])
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    await asyncio.sleep(max(0.0, config["latency"] + random.uniform(-config["jitter"], config["jitter"])))
+
+    if body.get("stream"):
+        counters["streamed"] += 1
+
+        async def events():
+            for i, token in enumerate(tokens):
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": (" " if i else "") + token}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(1 / config["tokens_per_second"])
+            done = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": body["model"], "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # Non-streaming clients still wait for the whole decode
+    await asyncio.sleep(len(tokens) / config["tokens_per_second"])
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": created,
+        "model": body["model"],
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": " ".join(tokens)},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        },
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI-compatible chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    for key, value in config.items():
+        parser.add_argument("--" + key.replace("_", "-"), type=type(value), default=value)
+    args = parser.parse_args()
+    for key in config:
+        config[key] = getattr(args, key)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import torch
 import sentencepiece as spm
 import os
 import sys
-from model import EduLLM
+from model import load_model
 
 # --- CONFIGURATION ---
 # Force CPU since we are on a laptop
@@ -29,13 +29,9 @@ def main():
         return
 
     try:
-        # Initialize the empty architecture
-        model = EduLLM(vocab_size)
-        
-        # Load the trained weights
-        # map_location='cpu' is CRITICAL because the model was saved on a GPU
-        checkpoint = torch.load(model_path, map_location=torch.device('cpu'))
-        model.load_state_dict(checkpoint)
+        # Build the architecture with its random init skipped and memory-map the
+        # trained weights straight from disk (no extra copy)
+        model = load_model(model_path, vocab_size)
         
         # Set to evaluation mode (turns off training-specific randomness)
         model.to(device)
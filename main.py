@@ -1,23 +1,49 @@
+import asyncio
+import base64
+import math
 import os
+import secrets
 from contextlib import asynccontextmanager
+from datetime import datetime
 
 from aiohttp import payload
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel, ConfigDict
-from sqlalchemy.orm import Session
-from openai import OpenAI
+from sqlalchemy import String, and_, delete, func, insert, literal, not_, or_, select, type_coerce, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 from dotenv import load_dotenv
+import orjson
+import xxhash
 
 from app import models, schemas
 from app.dependencies import get_db
+from app.llm import LLMGateway, LLMOverloaded
+from app.cache import ResponseCache
+from app.semantic_cache import SemanticCache
+from app.singleflight import SingleFlight
+from app.admission import FairScheduler, RateLimited
+from app.shared_state import SharedRateLimiter
+from app.generation import Generator, generated_note
+from app.jobs import FINISHED, PENDING, JobRunner, new_job_id
+from app.note_writer import NoteWriter
+from app.search import SearchUnavailable, search
+from app.export import (
+    ImportFailed, ImportTooLarge, body_lines, export_ndjson, export_zip, import_lines, limited, zip_lines,
+)
+from app.static import FrontendAssets
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry
+from app.database import async_engine, pool_stats
+from app.config import settings
+from app.hashing import HasherBusy, password_hasher
 from app.auth import (
-    hash_password,
-    verify_password,
     create_access_token,
     get_current_user,
+    token_claims,
 )
 
 load_dotenv()
@@ -26,27 +52,91 @@ API_KEY = os.getenv("GROQ_API_KEY")
 model_context = {}
 
 
-# Lifespan (Groq Client Init)
+# Lifespan (Groq Gateway Init)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🔌 Initializing NeuroNotes Pro...")
+    password_hasher.start()
     if not API_KEY:
         print("❌ ERROR: 'GROQ_API_KEY' not found in .env!")
     else:
         try:
-            client = OpenAI(
-                api_key=API_KEY,
-                base_url="https://api.groq.com/openai/v1",
-            )
-            model_context["client"] = client
-            print("🚀 Groq AI Client successfully initialized!")
+            model_context["llm"] = LLMGateway(api_key=API_KEY)
+            print("🚀 Groq AI Gateway successfully initialized!")
         except Exception as e:
             print(f"❌ CRITICAL ERROR: {e}")
+    model_context["flights"] = SingleFlight()
+    if settings.SHARED_STATE_PATH:
+        model_context["shared_limiter"] = SharedRateLimiter(settings.SHARED_STATE_PATH)
+    model_context["scheduler"] = FairScheduler(shared=model_context.get("shared_limiter"))
+    if settings.LLM_CACHE_ENABLED:
+        model_context["cache"] = ResponseCache()
+        print("🗄️  Response cache enabled")
+        if settings.SEMANTIC_CACHE_ENABLED:
+            model_context["semantic_cache"] = SemanticCache()
+    if "llm" in model_context:
+        model_context["generator"] = Generator(
+            llm=model_context["llm"],
+            scheduler=model_context["scheduler"],
+            flights=model_context["flights"],
+            cache=model_context.get("cache"),
+            semantic=model_context.get("semantic_cache"),
+        )
+        model_context["jobs"] = JobRunner(model_context["generator"])
+        model_context["jobs"].start()
+        print(f"🧵 Started {settings.JOB_WORKERS} generation job workers")
+        if settings.NOTE_WRITE_BEHIND and async_engine.dialect.name == "postgresql":
+            model_context["note_writer"] = NoteWriter()
+            model_context["note_writer"].start()
+            print("✍️  Write-behind persistence of generated notes enabled")
+
+    # Existing component stats, read at scrape time by /metrics
+    registry.add_stats("neuronotes_bcrypt", password_hasher.stats, "Password hashing pool",
+                       counters=("completed", "failed", "rejected", "rehashed"))
+    registry.add_stats("neuronotes_db_pool", lambda: pool_stats(async_engine), "Database connection pool")
+    registry.add_stats("neuronotes_admission", model_context["scheduler"].stats, "Generation admission",
+                       counters=("admitted", "rate_limited", "queue_full", "queue_timeouts", "shared_errors"))
+    registry.add_stats("neuronotes_coalescing", model_context["flights"].stats, "Identical request coalescing",
+                       counters=("executed", "coalesced"))
+    if "llm" in model_context:
+        registry.add_stats("neuronotes_llm", model_context["llm"].stats, "Upstream LLM gateway")
+        registry.add_stats("neuronotes_jobs", model_context["jobs"].stats, "Background generation jobs",
+                           counters=("succeeded", "failed", "retried", "requeued_stale"))
+    if "note_writer" in model_context:
+        registry.add_stats("neuronotes_note_writer", model_context["note_writer"].stats,
+                           "Write-behind note persistence")
+    if "cache" in model_context:
+        registry.add_stats("neuronotes_llm_cache", model_context["cache"].stats, "LLM response cache",
+                           counters=("hits", "disk_hits", "misses", "evictions", "disk_errors"))
+    if "semantic_cache" in model_context:
+        registry.add_stats("neuronotes_semantic_cache", model_context["semantic_cache"].stats,
+                           "Near-duplicate response cache", counters=("hits", "misses"))
     yield
+    for prefix in ("bcrypt", "db_pool", "admission", "coalescing", "llm", "jobs", "note_writer",
+                   "llm_cache", "semantic_cache"):
+        registry.remove_stats(f"neuronotes_{prefix}")
+    # Requests are done by now; write out the notes still queued
+    note_writer = model_context.get("note_writer")
+    if note_writer:
+        await note_writer.stop()
+    jobs = model_context.get("jobs")
+    if jobs:
+        await jobs.stop()
+    llm = model_context.get("llm")
+    if llm:
+        await llm.aclose()
+    cache = model_context.get("cache")
+    if cache:
+        cache.close()
+    shared_limiter = model_context.get("shared_limiter")
+    if shared_limiter:
+        shared_limiter.close()
+    password_hasher.shutdown()
     model_context.clear()
 
 
-app = FastAPI(lifespan=lifespan)
+# orjson renders the validated response models several times faster than json.dumps
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -55,6 +145,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger API responses; the frontend assets are already precompressed
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=settings.RESPONSE_GZIP_MIN_BYTES,
+    compresslevel=settings.RESPONSE_GZIP_LEVEL,
+)
+
+# Added last so it wraps everything: latency includes compression
+app.add_middleware(MetricsMiddleware)
+
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("authorization", "")
+        if not secrets.compare_digest(supplied, f"Bearer {settings.METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+# Per-user generation quota exceeded
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+# Password hashing queue is full
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request: Request, exc: HasherBusy):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "2"},
+    )
+
 
 # Generate Request Schema
 class GenerateRequest(BaseModel):
@@ -62,6 +192,8 @@ class GenerateRequest(BaseModel):
     prompt: str
     max_tokens: int = 4000
     temperature: float = 0.7
+    # Frontend preset name; enables near-duplicate cache hits for it
+    preset: str | None = None
 
 
 class FlashcardDeckCreate(BaseModel):
@@ -70,26 +202,28 @@ class FlashcardDeckCreate(BaseModel):
     cards: list[dict]
 
 
-class FlashcardDeckResponse(BaseModel):
+class FlashcardDeckSummary(BaseModel):
     id: int
     topic: str
     difficulty: str
     count: int
-    cards: list[dict]
-    saved_at: str
+    saved_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class FlashcardDeckResponse(FlashcardDeckSummary):
+    cards: list[dict]
+
+
 # AUTH ENDPOINTS
 
 # Register
 @app.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing_user = (
-        db.query(models.User)
-        .filter(models.User.email == user.email)
-        .first()
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    existing_user = await db.scalar(
+        select(models.User)
+        .where(models.User.email == user.email)
     )
 
     if existing_user:
@@ -97,36 +231,44 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
     new_user = models.User(
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await password_hasher.hash(user.password),
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return new_user
 
 
 # Login
 @app.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    db_user = (
-        db.query(models.User)
-        .filter(models.User.email == form_data.username)
-        .first()
+    db_user = await db.scalar(
+        select(models.User)
+        .where(models.User.email == form_data.username)
     )
 
-    if not db_user or not verify_password(
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await password_hasher.verify_and_update(
         form_data.password,
         db_user.hashed_password,
-    ):
+    )
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # Stored hash used outdated bcrypt parameters: upgrade it transparently
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+
     access_token = create_access_token(
-        data={"sub": db_user.email}
+        data=token_claims(db_user)
     )
 
     return {
@@ -137,7 +279,7 @@ def login(
 
 # Current User
 @app.get("/me")
-def read_current_user(
+async def read_current_user(
     current_user: models.User = Depends(get_current_user),
 ):
     return {
@@ -149,19 +291,23 @@ def read_current_user(
 
 # Change Password
 @app.post("/change-password")
-def change_password(
+async def change_password(
     payload: schemas.ChangePasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    if not verify_password(payload.old_password, current_user.hashed_password):
+    if not await password_hasher.verify(
+        payload.old_password,
+        current_user.hashed_password,
+    ):
         raise HTTPException(
             status_code=400, detail="Old password is incorrect")
 
-    current_user.hashed_password = hash_password(payload.new_password)
+    current_user.hashed_password = await password_hasher.hash(
+        payload.new_password)
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
 
     return {"message": "Password updated successfully"}
 
@@ -170,9 +316,9 @@ def change_password(
 
 # Create Note
 @app.post("/notes", response_model=schemas.NoteResponse)
-def create_note(
+async def create_note(
     note: schemas.NoteCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     new_note = models.Note(
@@ -182,53 +328,235 @@ def create_note(
     )
 
     db.add(new_note)
-    db.commit()
-    db.refresh(new_note)
+    await db.commit()
+    await db.refresh(new_note)
 
     return new_note
 
 
-# Get User Notes
-@app.get("/notes", response_model=list[schemas.NoteResponse])
-def get_notes(
+async def write_pending_notes(owner_id: int):
+    """Generated notes may still be queued by the note writer; write the
+    user's first, so the query that follows finds them."""
+    note_writer = model_context.get("note_writer")
+    if note_writer:
+        try:
+            await note_writer.flush_owner(owner_id)
+        except Exception as e:
+            print(f"⚠️  Queued notes could not be written: {e}")
+            raise HTTPException(
+                status_code=503, detail="Recent notes are still being saved, try again shortly")
+
+
+def encode_note_cursor(created_at, note_id: int) -> str:
+    """Opaque page cursor holding the last note's (created_at, id)."""
+    # SQLite returns created_at as stored text, Postgres as a datetime
+    raw = created_at.isoformat() if isinstance(created_at, datetime) else created_at
+    return base64.urlsafe_b64encode(orjson.dumps([raw, note_id])).decode()
+
+
+def decode_note_cursor(cursor: str):
+    try:
+        raw, note_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(raw, str) or not isinstance(note_id, int):
+            raise ValueError
+        if async_engine.dialect.name == "sqlite":
+            # Compared as the stored text, exactly as ORDER BY sorts it
+            return literal(raw, String), note_id
+        return datetime.fromisoformat(raw), note_id
+    except (ValueError, TypeError, orjson.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+# Get User Notes (newest first, keyset-paginated summaries)
+@app.get("/notes", response_model=schemas.NotePage)
+async def get_notes(
     saved: bool | None = Query(default=None),
-    db: Session = Depends(get_db),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
+    await write_pending_notes(current_user.id)
+    # Only the stored preview is read, never the (compressed) body
     query = (
-        db.query(models.Note)
-        .filter(models.Note.owner_id == current_user.id)
+        select(
+            models.Note.id,
+            models.Note.title,
+            models.Note.created_at,
+            models.Note.is_bookmarked,
+            func.coalesce(models.Note.preview, "").label("preview"),
+        )
+        .where(models.Note.owner_id == current_user.id)
     )
 
-    if saved is True:
-        query = query.filter(models.Note.is_bookmarked == True)
+    if saved is not None:
+        query = query.where(models.Note.is_bookmarked == saved)
+
+    if cursor is not None:
+        cursor_created_at, cursor_id = decode_note_cursor(cursor)
+        # Continue after the last note of the previous page in (created_at,
+        # id) order; the values come from the cursor itself, so the page
+        # boundary holds even if that note was deleted meanwhile
+        query = query.where(
+            or_(
+                models.Note.created_at < cursor_created_at,
+                and_(
+                    models.Note.created_at == cursor_created_at,
+                    models.Note.id < cursor_id,
+                ),
+            )
+        )
+
+    rows = (await db.execute(
+        query.add_columns(type_coerce(models.Note.created_at, String).label("created_at_raw"))
+        .order_by(models.Note.created_at.desc(), models.Note.id.desc())
+        .limit(limit + 1)
+    )).all()
 
-    notes = query.order_by(models.Note.created_at.desc()).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
-    return notes
+    return {
+        "items": rows,
+        "next_cursor": encode_note_cursor(rows[-1].created_at_raw, rows[-1].id) if has_more else None,
+    }
+
+
+# Get a single note with its full content
+@app.get("/notes/{note_id}", response_model=schemas.NoteResponse)
+async def get_note(
+    note_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    note = await db.scalar(
+        select(models.Note)
+        .where(
+            models.Note.id == note_id,
+            models.Note.owner_id == current_user.id,
+        )
+    )
+
+    if not note:
+        # A just-generated note may still be queued for writing
+        note_writer = model_context.get("note_writer")
+        pending = note_writer.pending(note_id) if note_writer else None
+        if pending and pending["owner_id"] == current_user.id:
+            return pending
+        raise HTTPException(status_code=404, detail="Note not found")
+
+    return note
+
+
+# Bulk create notes (single multi-row INSERT)
+@app.post("/notes/bulk", response_model=schemas.BulkResponse)
+async def bulk_create_notes(
+    payload: schemas.NoteBulkCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    ids = (await db.scalars(
+        insert(models.Note).returning(
+            models.Note.id, sort_by_parameter_order=True),
+        [
+            {
+                "title": note.title,
+                "content": note.content,
+                "owner_id": current_user.id,
+                "is_bookmarked": False,
+            }
+            for note in payload.notes
+        ],
+    )).all()
+    await db.commit()
+
+    return {
+        "results": [{"id": note_id, "status": "created"} for note_id in ids]
+    }
+
+
+# Bulk delete notes (single set-based DELETE scoped to the owner)
+@app.post("/notes/bulk-delete", response_model=schemas.BulkResponse)
+async def bulk_delete_notes(
+    payload: schemas.NoteBulkIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    await write_pending_notes(current_user.id)
+    deleted = set((await db.scalars(
+        delete(models.Note)
+        .where(
+            models.Note.owner_id == current_user.id,
+            models.Note.id.in_(set(payload.ids)),
+        )
+        .returning(models.Note.id)
+    )).all())
+    await db.commit()
+
+    return {
+        "results": [
+            {"id": note_id, "status": "deleted" if note_id in deleted else "not_found"}
+            for note_id in payload.ids
+        ]
+    }
+
+
+# Bulk set or toggle bookmarks (single set-based UPDATE scoped to the owner)
+@app.post("/notes/bulk-bookmark", response_model=schemas.BulkResponse)
+async def bulk_bookmark_notes(
+    payload: schemas.NoteBulkBookmark,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    await write_pending_notes(current_user.id)
+    new_value = (
+        not_(models.Note.is_bookmarked)
+        if payload.bookmarked is None
+        else payload.bookmarked
+    )
+    updated = dict((await db.execute(
+        update(models.Note)
+        .where(
+            models.Note.owner_id == current_user.id,
+            models.Note.id.in_(set(payload.ids)),
+        )
+        .values(is_bookmarked=new_value)
+        .returning(models.Note.id, models.Note.is_bookmarked)
+        .execution_options(synchronize_session=False)
+    )).all())
+    await db.commit()
+
+    return {
+        "results": [
+            {"id": note_id, "status": "updated", "is_bookmarked": updated[note_id]}
+            if note_id in updated
+            else {"id": note_id, "status": "not_found"}
+            for note_id in payload.ids
+        ]
+    }
 
 
 # Delete Note
 @app.delete("/notes/{note_id}")
-def delete_note(
+async def delete_note(
     note_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    note = (
-        db.query(models.Note)
-        .filter(
+    await write_pending_notes(current_user.id)
+    note = await db.scalar(
+        select(models.Note)
+        .where(
             models.Note.id == note_id,
             models.Note.owner_id == current_user.id,
         )
-        .first()
     )
 
     if not note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    db.delete(note)
-    db.commit()
+    await db.delete(note)
+    await db.commit()
 
     return {"message": "Note deleted successfully"}
 
@@ -236,18 +564,18 @@ def delete_note(
 
 
 @app.patch("/notes/{note_id}/bookmark")
-def toggle_bookmark(
+async def toggle_bookmark(
     note_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    note = (
-        db.query(models.Note)
-        .filter(
+    await write_pending_notes(current_user.id)
+    note = await db.scalar(
+        select(models.Note)
+        .where(
             models.Note.id == note_id,
             models.Note.owner_id == current_user.id,
         )
-        .first()
     )
 
     if not note:
@@ -255,72 +583,254 @@ def toggle_bookmark(
 
     note.is_bookmarked = not note.is_bookmarked
 
-    db.commit()
-    db.refresh(note)
+    await db.commit()
+    await db.refresh(note)
 
     return note
 
 
+# Full-text search over the user's notes and flashcard decks
+@app.get("/search", response_model=schemas.SearchPage)
+async def search_content(
+    q: str = Query(min_length=1, max_length=200),
+    kind: str = Query(default="all", pattern="^(all|notes|decks)$"),
+    limit: int = Query(default=20, ge=1, le=50),
+    offset: int = Query(default=0, ge=0, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    await write_pending_notes(current_user.id)
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty search query")
+
+    kinds = {
+        "all": ["note", "deck"],
+        "notes": ["note"],
+        "decks": ["deck"],
+    }[kind]
+
+    try:
+        hits, has_more = await search(db, current_user.id, q, kinds, limit, offset)
+    except SearchUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "items": hits,
+        "next_offset": offset + limit if has_more else None,
+    }
+
+
+# Export all of the user's notes and decks, streamed as it is read
+@app.get("/export")
+async def export_data(
+    format: str = Query(default="ndjson", pattern="^(ndjson|zip)$"),
+    current_user: models.User = Depends(get_current_user),
+):
+    await write_pending_notes(current_user.id)
+    filename = f"neuronotes-export-{datetime.now():%Y%m%d}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if format == "zip":
+        body, media_type = export_zip(current_user.id), "application/zip"
+        # Already deflated; a set Content-Encoding keeps GZipMiddleware off it
+        headers["Content-Encoding"] = "identity"
+    else:
+        body, media_type = export_ndjson(current_user.id), "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+# Import an export (NDJSON body, or the zip), in batched transactions
+@app.post("/import", response_model=schemas.ImportResult)
+async def import_data(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    if int(request.headers.get("content-length") or 0) > settings.IMPORT_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload is larger than {settings.IMPORT_MAX_BYTES} bytes")
+
+    # The byte limit is also enforced while streaming (chunked uploads)
+    body = limited(request.stream())
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(("application/zip", "application/x-zip-compressed")):
+        lines = zip_lines(body)
+    else:
+        lines = body_lines(body)
+
+    try:
+        return await import_lines(db, current_user.id, lines)
+    except ImportTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ImportFailed as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # GENERATE (Protected)
 @app.post("/generate")
 async def generate_text(
     request: GenerateRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    # DEBUG PRINT — this will confirm presets are changing
-    print("\n===== SYSTEM PROMPT (FRONTEND) =====")
-    print(request.system_prompt)
-    print("====================================\n")
-
-    client = model_context.get("client")
-    if not client:
+    generator = model_context.get("generator")
+    if not generator:
         raise HTTPException(
             status_code=503, detail="AI Client not initialized.")
 
+    # Token bucket + queue bound per user; raises RateLimited (429)
+    await model_context["scheduler"].admit(current_user.id)
+
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {
-                    "role": "system",
-                    "content": request.system_prompt or "You are NeuroNotes Pro."
-                },
-                {"role": "user", "content": request.prompt},
-            ],
+        generated_text, cached = await generator.generate(
+            user_id=current_user.id,
+            system_prompt=request.system_prompt,
+            prompt=request.prompt,
             temperature=request.temperature,
             max_tokens=request.max_tokens,
+            preset=request.preset,
         )
 
-        generated_text = completion.choices[0].message.content
+    except LLMOverloaded as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "5"})
 
-        new_note = models.Note(
-            title=request.prompt[:50] if request.prompt else "Untitled",
-            content=generated_text,
-            owner_id=current_user.id,
-            is_bookmarked=False,
-        )
+    except RateLimited:
+        raise
 
-        db.add(new_note)
-        db.commit()
-        db.refresh(new_note)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Groq API Error: {str(e)}")
 
-        return {
-            "response": generated_text,
-            "note_id": new_note.id,
-        }
+    new_note = generated_note(current_user.id, request.prompt, generated_text, request.system_prompt)
 
+    # Saving is not the LLM's fault, so its failures get their own answer
+    try:
+        note_writer = model_context.get("note_writer")
+        if note_writer:
+            # Queued and written in a batch; the id is reserved up front
+            note_id = await note_writer.add(new_note)
+        else:
+            db.add(new_note)
+            await db.commit()
+            note_id = new_note.id
     except Exception as e:
+        print(f"⚠️  Generated note could not be saved: {e}")
         raise HTTPException(
-            status_code=500, detail=f"Groq API Error: {str(e)}")
+            status_code=503, detail="The note could not be saved, try again shortly")
+
+    return {
+        "response": generated_text,
+        "note_id": note_id,
+        "cached": cached,
+    }
+
+# LLM gateway queueing metrics
+@app.get("/llm/stats")
+async def llm_stats(current_user: models.User = Depends(get_current_user)):
+    llm = model_context.get("llm")
+    if not llm:
+        raise HTTPException(
+            status_code=503, detail="AI Client not initialized.")
+    cache = model_context.get("cache")
+    semantic = model_context.get("semantic_cache")
+    return {
+        **llm.stats(),
+        "cache": cache.stats() if cache else None,
+        "semantic_cache": semantic.stats() if semantic else None,
+        "coalescing": model_context["flights"].stats(),
+        "admission": model_context["scheduler"].stats(),
+        "jobs": model_context["jobs"].stats(),
+    }
+
+
+# BACKGROUND GENERATION JOBS (Protected)
+
+# Queue a generation; the result is saved as a note by a job worker
+@app.post("/jobs/generate", response_model=schemas.JobSubmitted, status_code=202)
+async def submit_generation_job(
+    request: GenerateRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    jobs = model_context.get("jobs")
+    if not jobs:
+        raise HTTPException(
+            status_code=503, detail="AI Client not initialized.")
+
+    pending = await db.scalar(
+        select(func.count())
+        .select_from(models.GenerationJob)
+        .where(
+            models.GenerationJob.owner_id == current_user.id,
+            models.GenerationJob.status.in_(PENDING),
+        )
+    )
+    if pending >= settings.JOB_MAX_PENDING_PER_USER:
+        raise RateLimited("Too many generation jobs pending", retry_after=10)
+
+    # Same per-user token bucket as /generate
+    await model_context["scheduler"].admit(current_user.id)
+
+    job = models.GenerationJob(
+        id=new_job_id(),
+        owner_id=current_user.id,
+        status="queued",
+        attempts=0,
+        system_prompt=request.system_prompt,
+        prompt=request.prompt,
+        preset=request.preset,
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+        cached=False,
+    )
+    db.add(job)
+    await db.commit()
+    jobs.notify()
+
+    return {"job_id": job.id, "status": job.status}
+
+
+# Job status; ?wait=N long-polls up to N seconds for the job to finish
+@app.get("/jobs/{job_id}", response_model=schemas.JobStatus)
+async def get_generation_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=settings.JOB_MAX_WAIT_SECONDS),
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    owner_id = current_user.id
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    while True:
+        job = await db.get(models.GenerationJob, job_id, populate_existing=True)
+        if not job or job.owner_id != owner_id:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        remaining = deadline - loop.time()
+        if job.status in FINISHED or remaining <= 0:
+            break
+
+        # Don't hold a pooled connection while waiting
+        await db.rollback()
+        jobs = model_context.get("jobs")
+        if jobs:
+            await jobs.wait(job_id, min(remaining, settings.JOB_POLL_SECONDS))
+        else:
+            await asyncio.sleep(min(remaining, settings.JOB_POLL_SECONDS))
+
+    result = schemas.JobStatus.model_validate(job)
+    if job.status == "succeeded" and job.note_id is not None:
+        result.response = await db.scalar(
+            select(models.Note.content).where(models.Note.id == job.note_id))
+    return result
 
 # Save a flashcard deck
 
 
 @app.post("/flashcards", response_model=FlashcardDeckResponse)
-def save_flashcard_deck(
+async def save_flashcard_deck(
     deck: FlashcardDeckCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
     new_deck = models.FlashcardDeck(
@@ -331,67 +841,118 @@ def save_flashcard_deck(
         owner_id=current_user.id,
     )
     db.add(new_deck)
-    db.commit()
-    db.refresh(new_deck)
-    return FlashcardDeckResponse(
-        id=new_deck.id,
-        topic=new_deck.topic,
-        difficulty=new_deck.difficulty,
-        count=new_deck.count,
-        cards=new_deck.cards,
-        saved_at=new_deck.saved_at.isoformat(),
-    )
+    await db.commit()
+    await db.refresh(new_deck)
+    return new_deck
+
+
+# Decks are never edited in place, so (id, saved_at) identifies a version
+def deck_version(deck) -> str:
+    return f"{deck.id}-{deck.saved_at.timestamp():.6f}"
+
 
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
 
-# Get all flashcard decks for current user
-@app.get("/flashcards", response_model=list[FlashcardDeckResponse])
-def get_flashcard_decks(
-    db: Session = Depends(get_db),
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+
+# Get all flashcard decks for current user (summaries only, no cards)
+@app.get("/flashcards", response_model=list[FlashcardDeckSummary])
+async def get_flashcard_decks(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    decks = (
-        db.query(models.FlashcardDeck)
-        .filter(models.FlashcardDeck.owner_id == current_user.id)
+    decks = (await db.execute(
+        select(
+            models.FlashcardDeck.id,
+            models.FlashcardDeck.topic,
+            models.FlashcardDeck.difficulty,
+            models.FlashcardDeck.count,
+            models.FlashcardDeck.saved_at,
+        )
+        .where(models.FlashcardDeck.owner_id == current_user.id)
         .order_by(models.FlashcardDeck.saved_at.desc())
-        .all()
-    )
-    return [
-        FlashcardDeckResponse(
-            id=d.id,
-            topic=d.topic,
-            difficulty=d.difficulty,
-            count=d.count,
-            cards=d.cards,
-            saved_at=d.saved_at.isoformat(),
+    )).all()
+
+    etag = 'W/"decks-' + xxhash.xxh64_hexdigest(
+        ",".join(deck_version(d) for d in decks)) + '"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    return decks
+
+
+# Get one flashcard deck with its cards
+@app.get("/flashcards/{deck_id}", response_model=FlashcardDeckResponse)
+async def get_flashcard_deck(
+    deck_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user),
+):
+    # Check the version first; the cards column is only read if it changed
+    deck = await db.scalar(
+        select(models.FlashcardDeck)
+        .options(defer(models.FlashcardDeck.cards))
+        .where(
+            models.FlashcardDeck.id == deck_id,
+            models.FlashcardDeck.owner_id == current_user.id,
         )
-        for d in decks
-    ]
+    )
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+
+    etag = f'W/"deck-{deck_version(deck)}"'
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    # Deferred columns can't lazy-load under asyncio; fetch it explicitly
+    await db.refresh(deck, ["cards"])
+
+    return deck
 
 
 # Delete a flashcard deck
 @app.delete("/flashcards/{deck_id}")
-def delete_flashcard_deck(
+async def delete_flashcard_deck(
     deck_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
 ):
-    deck = (
-        db.query(models.FlashcardDeck)
-        .filter(
+    deck = await db.scalar(
+        select(models.FlashcardDeck)
+        .where(
             models.FlashcardDeck.id == deck_id,
             models.FlashcardDeck.owner_id == current_user.id,
         )
-        .first()
     )
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
-    db.delete(deck)
-    db.commit()
+    await db.delete(deck)
+    await db.commit()
     return {"message": "Deck deleted"}
 
 
 # Static Files
-app.mount("/", StaticFiles(directory=".", html=True), name="static")
+# Frontend only (index.html, script.js, styles.css), fingerprinted and precompressed
+app.mount("/", FrontendAssets(), name="static")
 
 
 # Run Server
@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 import torch
 import torch.nn as nn
 from torch.nn import functional as F
@@ -32,7 +34,7 @@ class MultiHeadAttention(nn.Module):
     def __init__(self, num_heads, head_size, n_embd, block_size, dropout):
         super().__init__()
         self.heads = nn.ModuleList([Head(head_size, n_embd, block_size, dropout) for _ in range(num_heads)])
-        self.proj = nn.Linear(n_embd, n_embd)
+        self.proj = nn.Linear(num_heads * head_size, n_embd)
         self.dropout = nn.Dropout(dropout)
 
     def forward(self, x):
@@ -41,29 +43,46 @@ class MultiHeadAttention(nn.Module):
         out = self.dropout(out)
         return out
 
+    @torch.no_grad()
+    def prune(self, keep):
+        """ keep only the heads at these indices, and the proj columns they feed """
+        head_size = self.heads[0].key.out_features
+        columns = torch.cat([torch.arange(i * head_size, (i + 1) * head_size) for i in keep])
+        self.heads = nn.ModuleList([self.heads[i] for i in keep])
+        self.proj = _sliced_linear(self.proj, in_index=columns)
+
 class FeedFoward(nn.Module):
     """ a simple linear layer followed by a non-linearity """
 
-    def __init__(self, n_embd, dropout):
+    def __init__(self, n_embd, dropout, n_hidden=None):
         super().__init__()
+        n_hidden = n_hidden or 4 * n_embd
         self.net = nn.Sequential(
-            nn.Linear(n_embd, 4 * n_embd),
+            nn.Linear(n_embd, n_hidden),
             nn.ReLU(),
-            nn.Linear(4 * n_embd, n_embd),
+            nn.Linear(n_hidden, n_embd),
             nn.Dropout(dropout),
         )
 
     def forward(self, x):
         return self.net(x)
 
+    @torch.no_grad()
+    def prune(self, keep):
+        """ keep only the hidden neurons at these indices """
+        keep = torch.as_tensor(keep)
+        self.net[0] = _sliced_linear(self.net[0], out_index=keep)
+        self.net[2] = _sliced_linear(self.net[2], in_index=keep)
+
 class Block(nn.Module):
     """ Transformer block: communication followed by computation """
 
-    def __init__(self, n_embd, n_head, block_size, dropout):
+    def __init__(self, n_embd, n_head, block_size, dropout, head_size=None, n_hidden=None):
         super().__init__()
-        head_size = n_embd // n_head
+        # a pruned block keeps the original head size with fewer heads
+        head_size = head_size or n_embd // n_head
         self.sa = MultiHeadAttention(n_head, head_size, n_embd, block_size, dropout)
-        self.ffwd = FeedFoward(n_embd, dropout)
+        self.ffwd = FeedFoward(n_embd, dropout, n_hidden)
         self.ln1 = nn.LayerNorm(n_embd)
         self.ln2 = nn.LayerNorm(n_embd)
 
@@ -74,12 +93,19 @@ class Block(nn.Module):
 
 class EduLLM(nn.Module):
 
-    def __init__(self, vocab_size, n_embd=384, n_head=6, n_layer=6, block_size=256, dropout=0.2):
+    def __init__(self, vocab_size, n_embd=384, n_head=6, n_layer=6, block_size=256, dropout=0.2,
+                 layer_heads=None, layer_hidden=None):
         super().__init__()
         self.block_size = block_size
+        # per-layer head counts and feed-forward widths, for pruned models
+        layer_heads = layer_heads or [n_head] * n_layer
+        layer_hidden = layer_hidden or [4 * n_embd] * n_layer
         self.token_embedding_table = nn.Embedding(vocab_size, n_embd)
         self.position_embedding_table = nn.Embedding(block_size, n_embd)
-        self.blocks = nn.Sequential(*[Block(n_embd, n_head, block_size, dropout) for _ in range(n_layer)])
+        self.blocks = nn.Sequential(*[
+            Block(n_embd, heads, block_size, dropout, n_embd // n_head, hidden)
+            for heads, hidden in zip(layer_heads, layer_hidden)
+        ])
         self.ln_f = nn.LayerNorm(n_embd) # final layer norm
         self.lm_head = nn.Linear(n_embd, vocab_size)
 
@@ -123,4 +149,57 @@ class EduLLM(nn.Module):
             idx_next = torch.multinomial(probs, num_samples=1) 
             # append sampled index to the running sequence
             idx = torch.cat((idx, idx_next), dim=1) 
-        return idx
\ No newline at end of file
+        return idx
+
+
+def _sliced_linear(linear, in_index=None, out_index=None):
+    """ a copy of an nn.Linear with only some of its input columns / output rows """
+    weight, bias = linear.weight, linear.bias
+    if out_index is not None:
+        weight = weight[out_index]
+        bias = bias[out_index] if bias is not None else None
+    if in_index is not None:
+        weight = weight[:, in_index]
+    sliced = nn.Linear(weight.shape[1], weight.shape[0], bias=bias is not None,
+                       device=weight.device, dtype=weight.dtype)
+    sliced.weight.copy_(weight)
+    if bias is not None:
+        sliced.bias.copy_(bias)
+    return sliced
+
+def layer_shapes(state_dict):
+    """ per-layer head counts and feed-forward widths of a (possibly pruned) checkpoint """
+    layer_heads, layer_hidden = [], []
+    for i in range(len({k.split('.')[1] for k in state_dict if k.startswith('blocks.')})):
+        layer_heads.append(len({k.split('.')[4] for k in state_dict if k.startswith(f'blocks.{i}.sa.heads.')}))
+        layer_hidden.append(state_dict[f'blocks.{i}.ffwd.net.0.weight'].shape[0])
+    return layer_heads, layer_hidden
+
+@contextmanager
+def skip_init():
+    """ build modules without running their (random) weight init """
+    originals = {cls: cls.reset_parameters for cls in (nn.Linear, nn.Embedding, nn.LayerNorm)}
+    for cls in originals:
+        cls.reset_parameters = lambda self: None
+    try:
+        yield
+    finally:
+        for cls, reset_parameters in originals.items():
+            cls.reset_parameters = reset_parameters
+
+def load_model(model_path, vocab_size, n_embd=384, n_head=6, n_layer=6, block_size=256, dropout=0.2, mmap=True):
+    """ build EduLLM without random init and attach weights memory-mapped from disk """
+    # mapping the file reads nothing yet; the shapes tell whether it was pruned
+    state_dict = torch.load(model_path, map_location='cpu', mmap=mmap, weights_only=True)
+    layer_heads, layer_hidden = layer_shapes(state_dict)
+    # parameters are left as uninitialised storage that is never touched ...
+    # (building on the meta device instead costs a one-off ~1.3s of meta kernel
+    # registration for tril/normal_, which is worse than the init we skip)
+    with skip_init():
+        model = EduLLM(vocab_size, n_embd, n_head, n_layer, block_size, dropout,
+                       layer_heads, layer_hidden)
+    # ... and is swapped for the checkpoint's storage, which stays in the page
+    # cache and is shared by every process that maps the same file
+    model.load_state_dict(state_dict, assign=True)
+    model.eval()
+    return model
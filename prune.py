@@ -0,0 +1,159 @@
+import argparse
+import os
+import time
+
+import torch
+
+from model import load_model
+from train import (
+    block_size, dropout, estimate_loss, get_batch, load_data, load_tokenizer,
+    n_embd, n_head, n_layer, train,
+)
+
+# --- CONFIGURATION (overridden by the command line) ---
+MODEL_PATH = os.path.join("data", "edullm_model.pt")
+PRUNED_PATH = os.path.join("data", "edullm_pruned.pt")
+SPEED_PROMPT = "Once upon a time"
+SEED = 1337
+
+
+def count_params(model):
+    return sum(p.numel() for p in model.parameters())
+
+
+def score(model, val_data, batches, batch_size):
+    """ importance of every head and hidden neuron, from validation batches
+
+    Each head's output and each ReLU output is multiplied by a gate of 1;
+    a unit's score is the mean |dLoss/dgate|, the first-order estimate of
+    how much the loss moves if it is removed (Michel et al., 2019).
+    """
+    blocks = list(model.blocks)
+    head_gates = [torch.ones(len(b.sa.heads), requires_grad=True) for b in blocks]
+    neuron_gates = [torch.ones(b.ffwd.net[0].out_features, requires_grad=True) for b in blocks]
+
+    hooks = []
+    for block, heads, neurons in zip(blocks, head_gates, neuron_gates):
+        for j, head in enumerate(block.sa.heads):
+            hooks.append(head.register_forward_hook(lambda m, i, out, g=heads, j=j: out * g[j]))
+        hooks.append(block.ffwd.net[1].register_forward_hook(lambda m, i, out, g=neurons: out * g))
+
+    head_scores = [torch.zeros_like(g) for g in head_gates]
+    neuron_scores = [torch.zeros_like(g) for g in neuron_gates]
+    # only the gates need gradients
+    trainable = [p for p in model.parameters() if p.requires_grad]
+    for p in trainable:
+        p.requires_grad_(False)
+    model.eval()
+    try:
+        for _ in range(batches):
+            X, Y = get_batch(val_data, batch_size, model.block_size)
+            _, loss = model(X, Y)
+            grads = torch.autograd.grad(loss, head_gates + neuron_gates)
+            for total, grad in zip(head_scores + neuron_scores, grads):
+                total += grad.abs()
+    finally:
+        for hook in hooks:
+            hook.remove()
+        for p in trainable:
+            p.requires_grad_(True)
+
+    # heads are ranked across layers, so put the layers on the same scale
+    head_scores = [s / (s.norm() + 1e-12) for s in head_scores]
+    return head_scores, [s / batches for s in neuron_scores]
+
+
+def prune(model, head_scores, neuron_scores, head_fraction, ffn_fraction):
+    """ physically remove the lowest-scoring heads (globally) and neurons (per layer) """
+    ranked = sorted(
+        (s.item(), layer, head)
+        for layer, scores in enumerate(head_scores)
+        for head, s in enumerate(scores)
+    )
+    n_drop = int(len(ranked) * head_fraction)
+    dropped = {layer: set() for layer in range(len(head_scores))}
+    for _, layer, head in ranked:
+        if n_drop == 0:
+            break
+        # every layer keeps at least one head
+        if len(dropped[layer]) + 1 < len(head_scores[layer]):
+            dropped[layer].add(head)
+            n_drop -= 1
+
+    for layer, block in enumerate(model.blocks):
+        block.sa.prune([h for h in range(len(block.sa.heads)) if h not in dropped[layer]])
+        scores = neuron_scores[layer]
+        n_keep = max(1, len(scores) - int(len(scores) * ffn_fraction))
+        # sorted, so kept neurons stay in their original order
+        block.ffwd.prune(torch.topk(scores, n_keep).indices.sort().values)
+    return model
+
+
+@torch.no_grad()
+def tokens_per_second(model, sp, new_tokens, runs=3):
+    """ CPU generation speed for one prompt, best of a few runs """
+    idx = torch.tensor([sp.encode_as_ids(SPEED_PROMPT)], dtype=torch.long)
+    model.generate(idx, max_new_tokens=4)  # warm-up
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        model.generate(idx, max_new_tokens=new_tokens)
+        best = min(best, time.perf_counter() - start)
+    return new_tokens / best
+
+
+def report(name, model, sp, val_data, args):
+    # the same validation batches for every model
+    torch.manual_seed(SEED)
+    val_loss = estimate_loss(model, {"val": val_data}, args.eval_iters, args.batch_size)["val"].item()
+    speed = tokens_per_second(model, sp, args.gen_tokens)
+    print(f"{name:<18} {count_params(model) / 1e6:>8.2f}M {val_loss:>9.4f} {speed:>10.1f}")
+    return val_loss, speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prune attention heads and feed-forward neurons from EduLLM")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--out", default=PRUNED_PATH)
+    parser.add_argument("--heads", type=float, default=0.33, help="fraction of all heads to remove")
+    parser.add_argument("--ffn", type=float, default=0.25, help="fraction of each layer's feed-forward neurons to remove")
+    parser.add_argument("--score-batches", type=int, default=20)
+    parser.add_argument("--finetune-iters", type=int, default=0, help="train this many steps after pruning (0: no fine-tuning)")
+    parser.add_argument("--learning-rate", type=float, default=1e-4)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--eval-iters", type=int, default=20)
+    parser.add_argument("--gen-tokens", type=int, default=100, help="tokens generated when timing CPU speed")
+    args = parser.parse_args()
+
+    torch.manual_seed(SEED)
+    sp = load_tokenizer()
+    print("⏳ Loading dataset into memory...")
+    train_data, val_data = load_data(sp)
+
+    # a private copy of the weights: pruning and fine-tuning change them
+    model = load_model(args.model, sp.get_piece_size(), n_embd, n_head, n_layer, block_size, dropout, mmap=False)
+    print(f"\n{'model':<18} {'params':>9} {'val loss':>9} {'tokens/s':>10}")
+    base_loss, base_speed = report("original", model, sp, val_data, args)
+
+    torch.manual_seed(SEED)
+    head_scores, neuron_scores = score(model, val_data, args.score_batches, args.batch_size)
+    prune(model, head_scores, neuron_scores, args.heads, args.ffn)
+    loss, speed = report("pruned", model, sp, val_data, args)
+
+    if args.finetune_iters:
+        print(f"🔥 Fine-tuning for {args.finetune_iters} steps...")
+        train(model, train_data, val_data, args.finetune_iters, save_path=None,
+              learning_rate=args.learning_rate, eval_interval=max(1, args.finetune_iters // 4),
+              eval_iters=args.eval_iters, batch_size=args.batch_size)
+        loss, speed = report("pruned + finetune", model, sp, val_data, args)
+
+    torch.save(model.state_dict(), args.out)
+    heads = [len(b.sa.heads) for b in model.blocks]
+    hidden = [b.ffwd.net[0].out_features for b in model.blocks]
+    print(f"\n✂️  Heads per layer: {heads}, feed-forward width: {hidden}")
+    print(f"⚡ {speed / base_speed:.2f}x tokens/s, val loss {loss - base_loss:+.4f} vs the original")
+    print(f"💾 Saved to {args.out} (load_model reads the pruned shapes from the checkpoint)")
+
+
+if __name__ == "__main__":
+    main()
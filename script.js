@@ -8,7 +8,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const showToast = msg => { toast.innerText = msg; toast.classList.add('show'); setTimeout(() => toast.classList.remove('show'), 2000); };
     const API_BASE = "http://127.0.0.1:8000";
 
-    let currentRawResponse = "", historyNotes = [], historyDisplayCount = 10, savedNotesData = [], lastGeneratedNoteId = null;
+    let currentRawResponse = "", historyNotes = [], historyCursor = null, savedNotesData = [], savedCursor = null, lastGeneratedNoteId = null;
     let isReg = false, isResizing = false;
 
     // ======================================================
@@ -131,19 +131,38 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
 
+    // GET /notes returns one page of summaries: { items, next_cursor }
+    const fetchNotesPage = async (params) => {
+        const res = await apiFetch(`${API_BASE}/notes?${new URLSearchParams(params)}`);
+        if (!res.ok) throw new Error("Fetch failed");
+        return res.json();
+    };
+
+    const NOTES_PAGE_SIZE = 10, SAVED_PAGE_SIZE = 50;
+
+    const appendShowMore = (container, onclick) => {
+        const btn = document.createElement('div'); btn.className = "list-item"; btn.style = "text-align:center; font-weight:600; color:var(--primary);";
+        btn.textContent = "Show More"; btn.onclick = onclick;
+        container.appendChild(btn);
+    };
+
+    const renderNotes = () => {
+        renderList($('historyList'), historyNotes, false);
+        renderList($('savedList'), savedNotesData, true);
+        if (historyCursor) appendShowMore($('historyList'), () => loadMoreNotes(false));
+        if (savedCursor) appendShowMore($('savedList'), () => loadMoreNotes(true));
+    };
+
+    // First page of each list
     const loadNotes = async () => {
         try {
-            const res = await apiFetch(`${API_BASE}/notes`);
-            if (!res.ok) throw new Error("Fetch failed");
-            const notes = await res.json();
-            historyNotes = notes.filter(n => !n.is_bookmarked); savedNotesData = notes.filter(n => n.is_bookmarked);
-            renderList($('historyList'), historyNotes.slice(0, historyDisplayCount), false);
-            renderList($('savedList'), savedNotesData, true);
-            if (historyNotes.length > historyDisplayCount) {
-                const btn = document.createElement('div'); btn.className = "list-item"; btn.style = "text-align:center; font-weight:600; color:var(--primary);";
-                btn.textContent = "Show More"; btn.onclick = () => { historyDisplayCount += 10; loadNotes(); };
-                $('historyList').appendChild(btn);
-            }
+            const [history, saved] = await Promise.all([
+                fetchNotesPage({ saved: false, limit: NOTES_PAGE_SIZE }),
+                fetchNotesPage({ saved: true, limit: SAVED_PAGE_SIZE }),
+            ]);
+            historyNotes = history.items; historyCursor = history.next_cursor;
+            savedNotesData = saved.items; savedCursor = saved.next_cursor;
+            renderNotes();
         } catch (e) {
             // FIX 10: Show toast on notes load failure instead of silent console.error
             console.error(e);
@@ -151,6 +170,19 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     };
 
+    // Next page of one list, continuing from its cursor; loaded items are kept
+    const loadMoreNotes = async (saved) => {
+        try {
+            const page = await fetchNotesPage({ saved, limit: saved ? SAVED_PAGE_SIZE : NOTES_PAGE_SIZE, cursor: saved ? savedCursor : historyCursor });
+            if (saved) { savedNotesData = savedNotesData.concat(page.items); savedCursor = page.next_cursor; }
+            else { historyNotes = historyNotes.concat(page.items); historyCursor = page.next_cursor; }
+            renderNotes();
+        } catch (e) {
+            console.error(e);
+            showToast("Could not load notes. Check your connection.");
+        }
+    };
+
     function updateUserUI(email) {
         const nameEl = document.querySelector(".user-info .name");
         const avEl = document.querySelector(".user-avatar");
@@ -164,8 +196,16 @@ document.addEventListener('DOMContentLoaded', () => {
         container.innerHTML = "";
         notes.forEach(note => {
             const wrap = document.createElement('div'); wrap.className = "list-item"; wrap.style.display = "flex"; wrap.style.justifyContent = "space-between";
-            const title = document.createElement('span'); title.style.cursor = "pointer"; title.textContent = note.title || note.content.substring(0, 25);
-            title.onclick = () => { userInput.value = note.title || ""; aiOutput.innerHTML = marked.parse(note.content); aiOutput.classList.remove("empty-state"); currentRawResponse = note.content; lastGeneratedNoteId = note.id; enableLiveCode(); };
+            const title = document.createElement('span'); title.style.cursor = "pointer"; title.textContent = note.title || note.preview.substring(0, 25);
+            // The list only carries a preview; fetch the full note on open
+            title.onclick = async () => {
+                try {
+                    const res = await apiFetch(`${API_BASE}/notes/${note.id}`);
+                    if (!res.ok) throw new Error();
+                    const full = await res.json();
+                    userInput.value = full.title || ""; aiOutput.innerHTML = marked.parse(full.content); aiOutput.classList.remove("empty-state"); currentRawResponse = full.content; lastGeneratedNoteId = full.id; enableLiveCode();
+                } catch { showToast("Could not open note"); }
+            };
             const btn = document.createElement('button'); btn.className = isSaved ? "hover-action" : "delete-btn hover-action"; btn.style = `background:transparent; border:none; cursor:pointer; color: ${isSaved ? '#818cf8' : '#ef4444'}`;
             btn.innerHTML = isSaved ? `<i class="fa-solid fa-bookmark"></i>` : `<i class="fa-solid fa-xmark"></i>`;
             btn.onclick = async (e) => { e.stopPropagation(); isSaved ? handleBookmark(note.id, true) : showDeleteModal(note.id); };
@@ -173,6 +213,15 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     };
 
+    // Cards for one saved deck (the browser revalidates via ETag, unchanged decks are a 304)
+    const fetchDeckCards = async (id) => {
+        try {
+            const res = await apiFetch(`${API_BASE}/flashcards/${id}`);
+            if (!res.ok) throw new Error();
+            return (await res.json()).cards;
+        } catch { return null; }
+    };
+
     // NEW — Render saved flashcard decks inside the sidebar
     async function renderSavedDecksSidebar() {
         const list = $('savedDecksList');
@@ -199,9 +248,12 @@ document.addEventListener('DOMContentLoaded', () => {
                 const label = document.createElement('span');
                 label.style.cursor = "pointer";
                 label.textContent = `${deck.count} · ${deck.topic}`;
-                label.onclick = () => {
+                label.onclick = async () => {
+                    // The list only has deck summaries; fetch the cards on open
+                    const cards = await fetchDeckCards(deck.id);
+                    if (!cards) return showToast("Could not open deck");
                     // Load deck into flashcard review
-                    const fcCardsLoaded = deck.cards.map((c, i) => ({ ...c, id: i }));
+                    const fcCardsLoaded = cards.map((c, i) => ({ ...c, id: i }));
 
                     // Set config for consistency
                     document.getElementById('fcSavedScreen')?.classList.add('hidden');
@@ -330,11 +382,15 @@ document.addEventListener('DOMContentLoaded', () => {
         toggleList('savedDecksList', 'savedDecksToggle');
     });
 
-    // FIX 8: Use Promise.all to delete notes in parallel instead of sequential await in a loop
+    // FIX 8: Clear history with bulk deletes instead of one request per note
     $('clearHistoryBtn')?.addEventListener("click", async () => {
         if (!confirm("Clear all history?")) return;
         try {
-            await Promise.all(historyNotes.map(n => apiFetch(`${API_BASE}/notes/${n.id}`, { method: "DELETE" })));
+            // History is paginated: delete it a page at a time, one bulk request per page
+            for (let page = await fetchNotesPage({ saved: false, limit: 200 }); page.items.length; page = await fetchNotesPage({ saved: false, limit: 200 })) {
+                const r = await apiFetch(`${API_BASE}/notes/bulk-delete`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ ids: page.items.map(n => n.id) }) });
+                if (!r.ok) throw new Error("Delete failed");
+            }
             await loadNotes(); showToast("History cleared");
         } catch { showToast("Error clearing history"); }
     });
@@ -400,7 +456,8 @@ document.addEventListener('DOMContentLoaded', () => {
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify({
                     system_prompt: systemPromptText.trim(),
-                    prompt: text.trim()
+                    prompt: text.trim(),
+                    preset: activePreset
                 })
             });
             if (!res.ok) throw new Error("Backend Error");
@@ -606,7 +663,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     headers: { "Content-Type": "application/json" },
                     body: JSON.stringify({
                         system_prompt: systemPrompt.trim(),
-                        prompt: text.trim()
+                        prompt: text.trim(),
+                        preset: preset
                     })
                 });
                 if (!res.ok) throw new Error("Backend Error");
@@ -941,8 +999,10 @@ document.addEventListener('DOMContentLoaded', () => {
                         </div>
                         <button class="fc-delete-deck" data-id="${deck.id}" title="Delete">✕</button>`;
 
-                    row.querySelector('.fc-saved-info').addEventListener('click', () => {
-                        fcCards = deck.cards.map((c, i) => ({ ...c, id: i }));
+                    row.querySelector('.fc-saved-info').addEventListener('click', async () => {
+                        const cards = await fetchDeckCards(deck.id);
+                        if (!cards) return showToast('Could not open deck');
+                        fcCards = cards.map((c, i) => ({ ...c, id: i }));
                         fcConfig.topic = deck.topic;
                         fcConfig.difficulty = deck.difficulty;
                         fcConfig.count = deck.count;
@@ -0,0 +1,118 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from dotenv import load_dotenv
+
+# --- CONFIGURATION (overridden by the command line or .env) ---
+load_dotenv()
+DEFAULT_WORKERS = int(os.getenv("WEB_WORKERS", 0))   # 0: one per core
+STATE_DIR = "data"
+# A worker that dies sooner than this after starting is restarted with a pause
+MIN_UPTIME_SECONDS = 5
+
+
+def threads_per_worker(workers: int) -> int:
+    """ split the cores between the workers, so BLAS/torch pools don't oversubscribe """
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def run_worker(sock: socket.socket, threads: int):
+    """ child process: serve the already-imported app on the inherited socket """
+    import uvicorn
+    import main
+    from app.database import async_engine, engine
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Pools built before the fork must not be reused; close=False leaves the parent's alone
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+    config = uvicorn.Config(main.app, log_level="warning", lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API with pre-forked worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--state-dir", default=STATE_DIR, help="where the shared cache and quota files go")
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count() or 1
+    threads = threads_per_worker(workers)
+
+    # Read at import time by numpy's BLAS and torch, so set before preloading
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, str(threads))
+    # Caches and quotas every worker sees
+    os.environ.setdefault("LLM_CACHE_PATH", os.path.join(args.state_dir, "llm_cache.sqlite3"))
+    os.environ.setdefault("SHARED_STATE_PATH", os.path.join(args.state_dir, "shared_state.sqlite3"))
+    # Write-behind queues notes in one process, where other workers can't see them
+    if workers > 1:
+        os.environ["NOTE_WRITE_BEHIND"] = "false"
+
+    # Preload: modules, the app and the precompressed frontend are built once
+    # here and shared copy-on-write by every worker
+    print(f"📦 Preloading the app before forking {workers} workers ({threads} threads each)...")
+    import main  # noqa: F401
+    # Keep the collector from touching (and so copying) the preloaded objects
+    gc.freeze()
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+
+    children: dict[int, float] = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(sock, threads)
+            finally:
+                os._exit(0)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(workers):
+        spawn()
+    print(f"🚀 Serving on http://{args.host}:{args.port} with {workers} workers")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started = children.pop(pid, None)
+        if stopping or started is None:
+            continue
+        print(f"⚠️  Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+        if time.monotonic() - started < MIN_UPTIME_SECONDS:
+            time.sleep(1)
+        spawn()
+
+    sock.close()
+    print("👋 All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
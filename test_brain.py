@@ -1,6 +1,6 @@
 import torch
 import sentencepiece as spm
-from model import EduLLM
+from model import load_model
 
 # --- CONFIG ---
 # Must match the "Medium Brain" settings we used in Colab
@@ -19,13 +19,9 @@ try:
     vocab_size = sp.get_piece_size()
     print(f"✅ Tokenizer loaded (Vocab: {vocab_size})")
 
-    # 2. Initialize the Empty Brain Structure
-    model = EduLLM(vocab_size, n_embd, n_head, n_layer)
-    
-    # 3. Load the Trained Weights (The Transplant)
-    # map_location='cpu' is CRITICAL here to convert GPU weights to CPU
-    checkpoint = torch.load("data/edullm_model.pt", map_location=torch.device('cpu'))
-    model.load_state_dict(checkpoint)
+    # 2 + 3. Build the Empty Brain Structure (random init skipped) and
+    # memory-map the Trained Weights into it (The Transplant)
+    model = load_model("data/edullm_model.pt", vocab_size, n_embd, n_head, n_layer)
     model.to(device)
     model.eval()
     print("✅ Model weights loaded successfully!")
@@ -16,42 +16,33 @@ n_head = 6             # Increased attention heads (was 4)
 n_layer = 6            # Increased depth (was 4)
 dropout = 0.2
 
-# --- SEED ---
-torch.manual_seed(1337)
-
 # --- PATHS ---
 DATA_PATH = os.path.join("data", "dataset.txt")
 TOKENIZER_PATH = os.path.join("data", "tokenizer.model")
 MODEL_SAVE_PATH = os.path.join("data", "edullm_model.pt")
 
-print(f"🚀 Training on device: {device}")
 
 # --- LOAD TOKENIZER ---
-if not os.path.exists(TOKENIZER_PATH):
-    raise FileNotFoundError(f"Tokenizer not found at {TOKENIZER_PATH}")
-sp = spm.SentencePieceProcessor()
-sp.load(TOKENIZER_PATH)
-vocab_size = sp.get_piece_size()
-print(f"✅ Tokenizer loaded. Vocab size: {vocab_size}")
+def load_tokenizer(path=TOKENIZER_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Tokenizer not found at {path}")
+    sp = spm.SentencePieceProcessor()
+    sp.load(path)
+    return sp
 
 # --- PREPARE DATA ---
-if not os.path.exists(DATA_PATH):
-    raise FileNotFoundError(f"Dataset not found at {DATA_PATH}. Run prepare_tinystories.py first!")
-
-print("⏳ Loading dataset into memory...")
-with open(DATA_PATH, 'r', encoding='utf-8') as f:
-    text = f.read()
-
-# Split into train/val
-data = torch.tensor(sp.encode_as_ids(text), dtype=torch.long)
-n = int(0.9 * len(data))
-train_data = data[:n]
-val_data = data[n:]
-print(f"✅ Data loaded. Train tokens: {len(train_data)}, Val tokens: {len(val_data)}")
+def load_data(sp, path=DATA_PATH):
+    """ tokenize the dataset and split it 90/10 into train/val """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Dataset not found at {path}. Run prepare_tinystories.py first!")
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    data = torch.tensor(sp.encode_as_ids(text), dtype=torch.long)
+    n = int(0.9 * len(data))
+    return data[:n], data[n:]
 
 # --- DATA LOADER ---
-def get_batch(split):
-    data_source = train_data if split == 'train' else val_data
+def get_batch(data_source, batch_size=batch_size, block_size=block_size):
     ix = torch.randint(len(data_source) - block_size, (batch_size,))
     x = torch.stack([data_source[i:i+block_size] for i in ix])
     y = torch.stack([data_source[i+1:i+block_size+1] for i in ix])
@@ -59,45 +50,71 @@ def get_batch(split):
     return x, y
 
 @torch.no_grad()
-def estimate_loss():
+def estimate_loss(model, splits, iters=eval_iters, batch_size=batch_size):
+    """ mean loss over `iters` random batches of each split, e.g. {'train': ..., 'val': ...} """
     out = {}
     model.eval()
-    for split in ['train', 'val']:
-        losses = torch.zeros(eval_iters)
-        for k in range(eval_iters):
-            X, Y = get_batch(split)
+    for split, data_source in splits.items():
+        losses = torch.zeros(iters)
+        for k in range(iters):
+            X, Y = get_batch(data_source, batch_size, model.block_size)
             logits, loss = model(X, Y)
             losses[k] = loss.item()
         out[split] = losses.mean()
     model.train()
     return out
 
-# --- INITIALIZE MODEL ---
-model = EduLLM(vocab_size, n_embd, n_head, n_layer, block_size, dropout)
-m = model.to(device)
-print(f"🧠 Model initialized with ~{sum(p.numel() for p in m.parameters())/1e6:.2f}M parameters")
+# --- TRAINING LOOP ---
+def train(model, train_data, val_data, max_iters=max_iters, save_path=MODEL_SAVE_PATH,
+          learning_rate=learning_rate, eval_interval=eval_interval, eval_iters=eval_iters,
+          batch_size=batch_size):
+    """ the training loop; also used to fine-tune pruned and distilled models """
+    optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate)
+    model.train()
+    for iter in range(max_iters):
+
+        # Every once in a while evaluate the loss on train and val sets
+        if iter % eval_interval == 0 or iter == max_iters - 1:
+            losses = estimate_loss(model, {'train': train_data, 'val': val_data}, eval_iters, batch_size)
+            print(f"step {iter}: train loss {losses['train']:.4f}, val loss {losses['val']:.4f}")
+            # Save checkpoint
+            if save_path:
+                torch.save(model.state_dict(), save_path)
+
+        # Sample a batch of data
+        xb, yb = get_batch(train_data, batch_size, model.block_size)
+
+        # Evaluate the loss
+        logits, loss = model(xb, yb)
+        optimizer.zero_grad(set_to_none=True)
+        loss.backward()
+        optimizer.step()
+    model.eval()
+    return model
 
-# --- OPTIMIZER ---
-optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate)
 
-# --- TRAINING LOOP ---
-print("🔥 Starting training...")
-for iter in range(max_iters):
-
-    # Every once in a while evaluate the loss on train and val sets
-    if iter % eval_interval == 0 or iter == max_iters - 1:
-        losses = estimate_loss()
-        print(f"step {iter}: train loss {losses['train']:.4f}, val loss {losses['val']:.4f}")
-        # Save checkpoint
-        torch.save(model.state_dict(), MODEL_SAVE_PATH)
-
-    # Sample a batch of data
-    xb, yb = get_batch('train')
-
-    # Evaluate the loss
-    logits, loss = model(xb, yb)
-    optimizer.zero_grad(set_to_none=True)
-    loss.backward()
-    optimizer.step()
-
-print(f"🎉 Training complete! Model saved to {MODEL_SAVE_PATH}")
\ No newline at end of file
+def main():
+    # --- SEED ---
+    torch.manual_seed(1337)
+    print(f"🚀 Training on device: {device}")
+
+    sp = load_tokenizer()
+    vocab_size = sp.get_piece_size()
+    print(f"✅ Tokenizer loaded. Vocab size: {vocab_size}")
+
+    print("⏳ Loading dataset into memory...")
+    train_data, val_data = load_data(sp)
+    print(f"✅ Data loaded. Train tokens: {len(train_data)}, Val tokens: {len(val_data)}")
+
+    # --- INITIALIZE MODEL ---
+    model = EduLLM(vocab_size, n_embd, n_head, n_layer, block_size, dropout)
+    m = model.to(device)
+    print(f"🧠 Model initialized with ~{sum(p.numel() for p in m.parameters())/1e6:.2f}M parameters")
+
+    print("🔥 Starting training...")
+    train(model, train_data, val_data)
+    print(f"🎉 Training complete! Model saved to {MODEL_SAVE_PATH}")
+
+
+if __name__ == "__main__":
+    main()